@@ -1,9 +1,10 @@
 from PySide6 import QtWidgets, QtCore, QtGui
 import sys
 import os
-import xml.etree.ElementTree as ET
-import xml.dom.minidom  # Import minidom for pretty-printing
 import random
+import difflib
+import time
+import contextlib
 
 # Ensure QApplication is running (MotionBuilder manages the event loop)
 app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
@@ -18,51 +19,23 @@ sys.path.append(parent_dir)
 
 from xmlcreator import launch_xml_creator
 import actionsList
+from functionRegistry import FunctionRegistry, appendFunctionDefinitions, diffRegistries
+from stackEngine import CONFIG_FILE, STACKS_FILE, sceneContext
+from stackCache import fileStamp
+from stackStore import openStackStore, stackVersion, StackConflictError
+from runHistory import RunHistory, historyPathFor
+from sceneState import captureSnapshot, restoreSnapshot, matchTakes, runOnTakes
+from stackTransaction import stackTransaction
+from stackValidation import validateStack, formatProblems
+from stackPlan import compileStack, runPlan, newResult, runStep
+from stackSearch import StackSearchIndex
+from stackBundle import exportBundle, importBundle, formatImportReport, BUNDLE_EXTENSION
 
 
 # Define global variables
 import pyfbsdk  # Ensure MotionBuilder SDK is available        
-system = pyfbsdk.FBSystem()
-saved_state = {}
-active_layer_val = None
 
-
-
-def loadFunctionDefinitionsFromXML(xml_file):
-    """Load function definitions from the given XML file.
-    
-    Each <Function> element in the XML is converted to a dictionary with keys:
-    - name: the Function name attribute
-    - definition: the text inside the <Definition> element
-    - input_type: from the <Input> element's type attribute (if present)
-    - default_value: from the <Input> element's default attribute (if present)
-    - options: from the <Input> element's options attribute (if present)
-    """
-    functions = []
-    if os.path.exists(xml_file):
-        try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            for f in root.findall("Function"):
-                fn_name = f.get("name", "").strip()
-                definition = f.findtext("Definition", "").strip()
-                description = f.findtext("Description", "").strip()
-                inputs = []
-                for input_elem in f.findall("./Inputs/Input"):
-                    inputs.append({
-                        "input_type": input_elem.get("type", "None").strip(),
-                        "default_value": input_elem.get("default", "").strip(),
-                        "options": input_elem.get("options", "").strip()
-                    })
-                functions.append({
-                    "name": fn_name,
-                    "definition": definition,
-                    "description": description,
-                    "inputs": inputs
-                })
-        except Exception as e:
-            print(f"Error loading XML: {e}")
-    return functions
+MAX_VISIBLE_ROWS = 15  # The action list scrolls beyond this many rows
 
 
 
@@ -70,8 +43,20 @@ class GUIGUI(QtWidgets.QWidget):
 
     def __init__(self, parent=None):
         super(GUIGUI, self).__init__(parent)
-        self.xml_file = os.path.join(os.path.expanduser("~/Documents"), "functions_config.xml")
-        self.function_definitions = loadFunctionDefinitionsFromXML(self.xml_file)
+        self.xml_file = CONFIG_FILE
+        self.function_registry = FunctionRegistry.fromXML(self.xml_file)
+        self.function_definitions = self.function_registry.definitions
+        self.function_model = FunctionListModel(self.function_registry, self)  # Shared by every function dropdown
+        self.bulk_edit_depth = 0  # > 0 inside bulkRowEdit; row geometry work waits for its end
+        self.input_pool = InputEditorPool(self.onInputEdited)  # Input widgets reused across rows and functions
+        self.config_stamp = fileStamp(self.xml_file)
+        self.compiled_plan = None  # Built lazily by getCompiledPlan
+        self.run_history = RunHistory(historyPathFor(STACKS_FILE))
+        self.saved_state = None  # SceneSnapshot taken by save_current_state
+        self.stack_store = openStackStore(self.getXMLFilePath(), history=True)  # For the 🕘 stack history
+        self.stack_versions = {}  # stack name -> version last loaded or saved by this session
+        self.transactional_run = False  # Run the whole stack as one undo step / evaluation
+        self.stepper = None  # StackStepper of the run in progress
         self.setWindowTitle("GUI GUI")
 
 
@@ -128,7 +113,7 @@ class GUIGUI(QtWidgets.QWidget):
 
 
         self.plus_button = QtWidgets.QPushButton("➕")
-        self.plus_button.clicked.connect(self.addDropdownInputRow)
+        self.plus_button.clicked.connect(lambda: self.addDropdownInputRow())
 
         self.settings_button = QtWidgets.QPushButton("⚙️")
         self.settings_button.clicked.connect(self.toggleSettingsPanel)
@@ -147,20 +132,42 @@ class GUIGUI(QtWidgets.QWidget):
         self.setFocus()  # Forces the focus to the main window, preventing the input box from being in edit mode
 
 
-        # --- Dropdown Container ---
-        self.dropdown_container_widget = QtWidgets.QWidget(self)
-        self.dropdown_input_container = QtWidgets.QVBoxLayout(self.dropdown_container_widget)
-        self.dropdown_input_container.setSpacing(2)
-        self.main_layout.addWidget(self.dropdown_container_widget)
-
-        # Initialize action rows list and add first dropdown row
-        self.action_rows = []
+        # --- Action Rows ---
+        # Rows live in a StackModel and are painted by ActionRowDelegate; only the
+        # focused row gets real widgets (see createRowEditor).
+        self.stack_model = StackModel(self)
+        self.row_delegate = ActionRowDelegate(self)
+        self.row_view = QtWidgets.QListView(self)
+        self.row_view.setModel(self.stack_model)
+        self.row_view.setItemDelegate(self.row_delegate)
+        self.row_view.setUniformItemSizes(True)
+        self.row_view.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.row_view.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.row_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)  # Editors are opened by focusRow
+        self.row_view.setStyleSheet("QListView { background-color: transparent; border: none; }")
+        self.row_view.selectionModel().currentChanged.connect(self.focusRow)
+        self.stack_model.rowsInserted.connect(self.fitRowView)
+        self.stack_model.rowsRemoved.connect(self.fitRowView)
+        self.stack_model.modelReset.connect(self.fitRowView)
+        self.stack_model.dataChanged.connect(self.invalidatePlan)
+        self.stack_model.modelReset.connect(self.invalidatePlan)
+        self.stack_model.rowsRemoved.connect(self.invalidatePlan)
+        self.stack_model.rowsInserted.connect(self.invalidatePlan)
+        self.main_layout.addWidget(self.row_view)
+
+        # Add the first row
         self.addDropdownInputRow(force_update=True)
 
-
-         # Connect dropdown interactions to reset the name input
-        for row in self.action_rows:
-            row["dropdown"].currentIndexChanged.connect(self.resetNameInput)
+        # Pick up edits to functions_config.xml (e.g. from the XML creator) without a relaunch.
+        # The folder is watched too, since an atomic save replaces the file and drops the file watch.
+        self.config_watcher = QtCore.QFileSystemWatcher(self)
+        self.watchConfigFile()
+        self.config_reload_timer = QtCore.QTimer(self)
+        self.config_reload_timer.setSingleShot(True)
+        self.config_reload_timer.setInterval(200)  # Editors often write in several steps
+        self.config_reload_timer.timeout.connect(self.reloadFunctionConfig)
+        self.config_watcher.fileChanged.connect(self.config_reload_timer.start)
+        self.config_watcher.directoryChanged.connect(self.config_reload_timer.start)
 
 
 
@@ -175,7 +182,19 @@ class GUIGUI(QtWidgets.QWidget):
         self.hide_ui_button.setFixedHeight(25)
         self.hide_ui_button.clicked.connect(self.toggleUIVisibility)
         
+        self.pause_button = QtWidgets.QPushButton("Pause")
+        self.pause_button.setFixedHeight(25)
+        self.pause_button.clicked.connect(self.togglePauseRun)
+        self.pause_button.setVisible(False)
+
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.setFixedHeight(25)
+        self.cancel_button.clicked.connect(self.cancelRun)
+        self.cancel_button.setVisible(False)
+
         self.run_layout.addWidget(self.run_button)
+        self.run_layout.addWidget(self.pause_button)
+        self.run_layout.addWidget(self.cancel_button)
         self.run_layout.addWidget(self.hide_ui_button)
         
         self.main_layout.addLayout(self.run_layout)
@@ -207,17 +226,16 @@ class GUIGUI(QtWidgets.QWidget):
 
 
     def updateInputField(self, row_data):
+        """Show the inputs of the row's function, with their defaults.
+
+        Widgets come from the input pool, so a function change only swaps
+        pooled widgets, or just resets values when the inputs stay the same.
+        """
         dropdown = row_data["dropdown"]
         layout = row_data["inputs_container_layout"]
 
-        # Clear any previous input widgets.
-        while layout.count():
-            item = layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
         selected_action = dropdown.currentText()
-        func_def = next((f for f in self.function_definitions if f["name"] == selected_action), None)
+        func_def = self.function_registry.byName(selected_action)
 
         # Update tooltip for dropdown.
         if func_def:
@@ -225,150 +243,51 @@ class GUIGUI(QtWidgets.QWidget):
         else:
             dropdown.setToolTip("")
 
-        # If no function definition, add a default text input.
-        if not func_def:
-            single_input = QtWidgets.QLineEdit()
-            single_input.setPlaceholderText("Enter value...")
-            layout.addWidget(single_input)
-            row_data["input_widgets"] = [single_input]
-            return
-
-        inputs = func_def.get("inputs", [])
-        if not inputs:
-            # No inputs defined: show one default text input.
-            single_input = QtWidgets.QLineEdit()
-            single_input.setPlaceholderText("Enter value...")
-            layout.addWidget(single_input)
-            row_data["input_widgets"] = [single_input]
+        # One or two inputs, in XML order; a single free text input (spec None) when the
+        # function is unknown or defines none.
+        specs = self.function_registry.inputSpecs(selected_action)[:2] or (None,)
+        if row_data.get("input_specs") == specs:
+            for widget, spec in zip(row_data["input_widgets"], specs):
+                self.input_pool.reset(widget, spec)
             return
 
-        # If there is exactly one input defined, create one widget.
-        # If two or more are defined, create exactly two separate widgets.
-        row_data["input_widgets"] = []
-        num_to_create = 1 if len(inputs) == 1 else 2
-
-        for i in range(num_to_create):
-            inp_def = inputs[i]  # We assume the XML defines these in order.
-            if inp_def["input_type"] == "Dropdown":
-                widget = QtWidgets.QComboBox()
-                widget.setFixedHeight(22)
-                if inp_def["options"]:
-                    opts = [o.strip() for o in inp_def["options"].split(",") if o.strip()]
-                    widget.addItems(opts)
-                if inp_def["default_value"] and inp_def["default_value"] in [widget.itemText(j) for j in range(widget.count())]:
-                    widget.setCurrentText(inp_def["default_value"])
-            else:
-                widget = QtWidgets.QLineEdit()
-                widget.setFixedHeight(22)
-                widget.setPlaceholderText("Enter value...")
-                if inp_def["default_value"]:
-                    widget.setText(inp_def["default_value"])
-
-            # Here we set a fixed width for each input widget so that when two exist they share the space.
-            widget.setFixedWidth(80)  # Adjust this value as needed.
+        self.releaseRowInputs(row_data)
+        row_data["input_specs"] = specs
+        for spec in specs:
+            widget = self.input_pool.acquire(spec, row_data)
             layout.addWidget(widget)
+            widget.show()
             row_data["input_widgets"].append(widget)
 
 
+    def releaseRowInputs(self, row_data):
+        """Hand a row's input widgets back to the pool."""
+        layout = row_data["inputs_container_layout"]
+        for widget in row_data["input_widgets"]:
+            layout.removeWidget(widget)
+            self.input_pool.release(widget)
+        row_data["input_widgets"] = []
+        row_data["input_specs"] = None
 
 
-
-        def save_current_state(self):
-            """Saves the current take, effector, active layer, and frame number before running actions."""
-            global saved_state, active_layer_val
-
-            # Get current take name and find its index
-            take = pyfbsdk.FBSystem().CurrentTake
-            take_name = take.Name if take else "None"
-
-            # Manually find the index of the current take
-            take_index = -1
-            if take:
-                for i, t in enumerate(pyfbsdk.FBSystem().Scene.Takes):
-                    if t == take:
-                        take_index = i
-                        break
-
-            # Get currently selected effector
-            selected_effector = None
-            for eff in pyfbsdk.FBSystem().Scene.Components:
-                if isinstance(eff, pyfbsdk.FBModel):  # Change to FBModel for effectors
-                    if eff.Selected:
-                        selected_effector = eff.LongName
-                        break  # Stop at the first selected effector
-
-
-            active_layer = pyfbsdk.FBSystem().CurrentTake.GetCurrentLayer()
-            # Since active_layer is now an integer, convert it to a string.
-            active_layer_val = str(active_layer) if active_layer is not None else "None"
-
-
-            # Get current frame number
-            current_frame = pyfbsdk.FBSystem().LocalTime.GetFrame()
-
-            if active_layer is not None:
-                active_layer_val = str(active_layer)
-            else:
-                active_layer_val = "None"
-
-            self.saved_state = {
-                "take_name": take_name,
-                "take_index": take_index,
-                "selected_effector": selected_effector or "None",
-                "active_layer": active_layer_val,
-                "current_frame": current_frame
-            }
-
-
-            print("✅ Saved State:", self.saved_state)  # Debug log
-
-
+    def onInputEdited(self, widget):
+        if widget.row_data is not None:
+            self.storeRowEditor(widget.row_data)
 
 
-    def restore_saved_state():        
-        # Restore the original take by name.
-        original_take_name = saved_state.get("take_name", None)
-        if original_take_name:
-            for t in system.Scene.Takes:
-                if t.Name == original_take_name:
-                    system.CurrentTake = t
-                    break
-            else:
-                print("Original take not found; it may have been renamed or deleted.")
-        
-        # Now restore active layer
-        current_take = system.CurrentTake
-        if current_take and "active_layer" in saved_state:
-            try:
-                current_layer_index = int(saved_state["active_layer"])
-                # Try using a setter method or property (depending on your SDK version)
-                try:
-                    current_take.SetCurrentLayer(current_layer_index)
-                except AttributeError:
-                    current_take.CurrentLayer = current_layer_index
-            except Exception as e:
-                print("Error restoring active layer:", e)
-        
-        # Restore current frame
-        if "current_frame" in saved_state:
-            try:
-                frame = int(saved_state["current_frame"])
-                time = pyfbsdk.FBTime(0, 0, frame)
-                pyfbsdk.FBPlayerControl().Goto(time)
-            except Exception as e:
-                print("Error restoring current frame:", e)
-        
-        # Restore selected effector
-        if "selected_effector" in saved_state:
-            desired_effector = saved_state["selected_effector"]
-            for comp in system.Scene.Components:
-                if hasattr(comp, "LongName"):
-                    comp.Selected = (comp.LongName == desired_effector)
 
 
 
+    def save_current_state(self):
+        """Snapshots the current take, active layer, frame and selection before running actions."""
+        self.saved_state = captureSnapshot(pyfbsdk)
 
 
+    def restore_saved_state(self):
+        """Puts back only what the actions changed since save_current_state."""
+        if self.saved_state is not None:
+            restoreSnapshot(pyfbsdk, self.saved_state)
+            self.saved_state = None
 
 
 
@@ -429,6 +348,8 @@ class GUIGUI(QtWidgets.QWidget):
         except ValueError:
             return  # ignore invalid input
         max_index = dropdown.count() - 1
+        if max_index < 0:
+            return  # No functions to pick from
         if value > max_index:
             index_input.setText(str(max_index))
             dropdown.setCurrentIndex(max_index)
@@ -477,7 +398,7 @@ class GUIGUI(QtWidgets.QWidget):
 
         # Hide or show the main UI elements
         for widget in [self.name_input, self.plus_button, self.settings_button,
-                    self.dropdown_container_widget, self.close_button]:
+                    self.row_view, self.close_button]:
             widget.setVisible(not self.ui_hidden)
 
         if self.ui_hidden:
@@ -507,10 +428,53 @@ class GUIGUI(QtWidgets.QWidget):
 
 
 
-    # Add a new Action row (Delete button, Dropdown, Input)
+    # Add a new Action row
     def addDropdownInputRow(self, force_update=True):
+        """Appends a row with the first function and its default values.
+
+        With force_update the new row is focused, so it gets its widgets,
+        and the window is resized right away.
+        """
+        name = self.function_registry.names[0] if self.function_registry.names else ""
+        if not force_update:
+            self.stack_model.insertActions(self.stack_model.rowCount(), [self.newActionRow(name)])
+            return
+
+        with self.bulkRowEdit():
+            self.stack_model.insertActions(self.stack_model.rowCount(), [self.newActionRow(name)])
+            self.row_view.setCurrentIndex(self.stack_model.index(self.stack_model.rowCount() - 1))
+
+
+    def rowValues(self, name, saved_values=()):
+        """Return the input values of a row: the function's defaults, overridden by non-empty saved values by position."""
+        specs = self.function_registry.inputSpecs(name)[:2]
+        if not specs:
+            return [saved_values[0].strip() if saved_values else ""]  # One free text input
+
+        values = []
+        for position, spec in enumerate(specs):
+            saved = saved_values[position].strip() if position < len(saved_values) else ""
+            if spec.input_type == "Dropdown":
+                default = spec.options[max(spec.default_index, 0)] if spec.options else ""
+                values.append(saved if saved in spec.options else default)
+            else:
+                values.append(saved or spec.default_value)
+        return values
+
+
+    def newActionRow(self, name, index="", saved_values=()):
+        """Build a StackModel row for a function."""
+        return {"name": name, "index": str(index), "values": self.rowValues(name, saved_values)}
+
+
+    def createRowEditor(self, parent):
+        """Builds the widgets of the focused row: delete button, index input, function dropdown and inputs.
+
+        Only one row has these at a time; ActionRowDelegate paints the rest.
+        """
         # Create a container widget for the entire action row.
-        row_container_widget = QtWidgets.QWidget()
+        row_container_widget = QtWidgets.QWidget(parent)
+        row_container_widget.setAutoFillBackground(True)  # Hide the painted row underneath
         row_container_layout = QtWidgets.QVBoxLayout(row_container_widget)
         row_container_layout.setContentsMargins(2, 2, 2, 2)
         row_container_layout.setSpacing(2)
@@ -541,11 +505,10 @@ class GUIGUI(QtWidgets.QWidget):
         dropdown = QtWidgets.QComboBox()
         dropdown.setFixedHeight(22)
         dropdown.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
-        dropdown.addItems([entry["name"] for entry in self.function_definitions])
-        for idx, func in enumerate(self.function_definitions):
-            dropdown.setItemData(idx, func.get("description", ""), QtCore.Qt.ToolTipRole)
-        dropdown.currentIndexChanged.connect(lambda idx: index_input.setText(str(idx)))
-        index_input.textChanged.connect(lambda text, inp=index_input, dd=dropdown: self.updateDropdownFromIndex(text, inp, dd))
+        dropdown.setModel(self.function_model)  # No items of its own to build
+        # Size from a fixed text length instead of measuring every function name.
+        dropdown.setSizeAdjustPolicy(QtWidgets.QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        dropdown.setMinimumContentsLength(10)
 
         # Add the controls to the main row.
         main_row_layout.addWidget(delete_button)
@@ -560,7 +523,6 @@ class GUIGUI(QtWidgets.QWidget):
         main_row_layout.addWidget(inputs_container_widget)
 
         row_container_layout.addWidget(main_row_widget)
-        self.dropdown_input_container.addWidget(row_container_widget)
 
         # Save references in row_data.
         row_data = {
@@ -570,20 +532,73 @@ class GUIGUI(QtWidgets.QWidget):
             "dropdown": dropdown,
             "inputs_container_widget": inputs_container_widget,
             "inputs_container_layout": inputs_container_layout,
-            "input_widgets": []  # to hold the actual input widgets
+            "input_widgets": [],  # to hold the actual input widgets, from the input pool
+            "input_specs": None,  # The specs input_widgets were set up for
+            "model_index": None,  # QPersistentModelIndex of the row being edited, set by loadRowEditor
+            "loading": False
         }
-        self.action_rows.append(row_data)
+        row_container_widget.row_data = row_data
 
         # Connect signals.
-        delete_button.clicked.connect(lambda: self.removeDropdownInputRow(row_data))
-        dropdown.currentIndexChanged.connect(lambda: self.updateInputField(row_data))
+        delete_button.clicked.connect(lambda: self.removeDropdownInputRow(row_data["model_index"].row()))
+        dropdown.currentIndexChanged.connect(lambda idx: index_input.setText(str(idx)))
+        index_input.textChanged.connect(lambda text: self.updateDropdownFromIndex(text, index_input, dropdown))
+        dropdown.currentIndexChanged.connect(lambda: self.onRowFunctionChanged(row_data))
         dropdown.currentIndexChanged.connect(self.resetNameInput)
+        return row_container_widget
+
 
+    def loadRowEditor(self, row_data, index):
+        """Fill the focused row's widgets from its StackModel row."""
+        row = self.stack_model.rows[index.row()]
+        row_data["model_index"] = QtCore.QPersistentModelIndex(index)
+        row_data["loading"] = True
+        dropdown = row_data["dropdown"]
+        dropdown.blockSignals(True)
+        position = self.function_registry.indexOf(row["name"])
+        # A function that is not in the config is shown as the placeholder of an empty
+        # selection; the shared list cannot hold per-row items. The row keeps its name.
+        dropdown.setPlaceholderText(f"{row['name']} (not in config)" if position < 0 else "")
+        dropdown.setCurrentIndex(position)
+        dropdown.blockSignals(False)
+        row_data["index_input"].blockSignals(True)
+        row_data["index_input"].setText(str(position) if position >= 0 else "")
+        row_data["index_input"].blockSignals(False)
         self.updateInputField(row_data)
+        self.fillRowInputs(row_data, row["values"])
+        row_data["loading"] = False
+
+
+    def storeRowEditor(self, row_data, *args):
+        """Write the focused row's widgets back to its StackModel row."""
+        index = row_data.get("model_index")
+        if row_data["loading"] or index is None or not index.isValid():
+            return
+        dropdown = row_data["dropdown"]
+        name = dropdown.currentText() if dropdown.currentIndex() >= 0 else self.stack_model.rows[index.row()]["name"]
+        self.stack_model.setAction(index.row(), name, [self.safe_get_text(w) for w in row_data["input_widgets"]])
+
+
+    def onRowFunctionChanged(self, row_data):
+        """A new function was picked in the focused row: show its inputs with their defaults."""
+        self.updateInputField(row_data)
+        self.storeRowEditor(row_data)
 
-        if force_update:
-            self.adjustSize()
-            QtWidgets.QApplication.processEvents()
+
+    def focusRow(self, current, previous):
+        """Give the newly focused row its widgets and turn the previous one back into a painted row."""
+        if previous.isValid():
+            self.row_view.closePersistentEditor(previous)
+        if current.isValid():
+            self.row_view.openPersistentEditor(current)
+
+
+    def fitRowView(self, *args):
+        """Size the row list to its rows, up to MAX_VISIBLE_ROWS; beyond that it scrolls."""
+        if self.bulk_edit_depth:
+            return  # relayoutRows does it once at the end
+        visible = min(self.stack_model.rowCount(), MAX_VISIBLE_ROWS)
+        self.row_view.setFixedHeight(visible * ActionRowDelegate.ROW_HEIGHT + 2 * self.row_view.frameWidth())
 
 
 
@@ -597,70 +612,58 @@ class GUIGUI(QtWidgets.QWidget):
 
     def getXMLFilePath(self):
         """Returns a safe file path for saving XML data in the user's Documents folder."""
-        documents_folder = os.path.expanduser("~/Documents")
-        file_path = os.path.join(documents_folder, "saved_stacks.xml")
-        return file_path
+        return STACKS_FILE
 
 
 
 
     def saveStack(self, stack_name):
-        file_path = self.getXMLFilePath()
-
-        # Load or create XML tree
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-            except ET.ParseError:
-                print("Error: XML file corrupted. Creating a new one.")
-                root = ET.Element("Stacks")
-                tree = ET.ElementTree(root)
-        else:
-            root = ET.Element("Stacks")
-            tree = ET.ElementTree(root)
-
-        # Remove existing stack with the same name before saving
-        for existing_stack in root.findall("Stack"):
-            if existing_stack.get("name") == stack_name:
-                root.remove(existing_stack)
-
-        # Create a new stack element
-        stack_element = ET.SubElement(root, "Stack", name=stack_name)
-
-        # Iterate over existing action rows
-        for row in self.action_rows:
-            action_name = row["dropdown"].currentText().strip()
-            action_index = row["dropdown"].currentIndex()  # Get dropdown index
-            action_value = ""
-
-            if "input" in row and row["input"] is not None:
-                action_value = self.safe_get_text(row["input"])
-            elif "text_input" in row and row["text_input"] is not None:
-                action_value = self.safe_get_text(row["text_input"])
-            elif "dropdown_widget" in row and row["dropdown_widget"] is not None:
-                try:
-                    action_value = row["dropdown_widget"].currentText().strip()
-                except RuntimeError:
-                    action_value = ""
+        actions = []
 
-            # Save both the function name and index
-            ET.SubElement(stack_element, "Action", name=action_name, index=str(action_index), value=action_value)
+        # Iterate over the action rows of the model
+        for row in self.stack_model.rows:
+            action_name = row["name"].strip()
+            action_index = self.function_registry.indexOf(action_name)  # Dropdown index
+            if action_index < 0:
+                action_index = row["index"]  # Not in the config; keep the index it was saved with
 
-        # Pretty-print and save XML
-        ET.indent(root, space="  ", level=0)
-        pretty_xml = ET.tostring(root, encoding="unicode")
-        pretty_xml = "\n".join([line for line in pretty_xml.split("\n") if line.strip()])
+            # Multiple inputs are stored ';'-separated, the way StackEngine reads them back.
+            action_value = ";".join(value.strip() for value in row["values"])
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(pretty_xml)
+            # Save both the function name and index
+            actions.append({"name": action_name, "index": str(action_index), "value": action_value})
+
+        # Only this stack is written; other stacks in the library are left alone.
+        try:
+            self.stack_store.upsertStack(stack_name, actions, self.stack_versions.get(stack_name))
+        except StackConflictError:
+            reply = QtWidgets.QMessageBox.question(
+                self, "Stack Changed",
+                f"Stack '{stack_name}' was changed in another session since you loaded it.\n"
+                "Overwrite it with this version? (The other version stays in the stack history.)"
+            )
+            if reply != QtWidgets.QMessageBox.Yes:
+                print(f"⚠️ Stack '{stack_name}' not saved; it was changed in another session.")
+                return
+            self.stack_store.upsertStack(stack_name, actions)
+        self.stack_versions[stack_name] = stackVersion(actions)
 
         print(f"✅ Stack '{stack_name}' saved successfully!")        
         self.output_bar.setText(f"Saved Stack: '{stack_name}'" )
 
         # **REFRESH THE LOAD MENU AFTER SAVING**
-        if hasattr(self, "load_popup"):  
-            self.load_popup.loadSavedStacks()  # Refresh the saved stacks
+        self.refreshLoadPopup([stack_name])
+
+
+    def refreshLoadPopup(self, changed_names=None):
+        """Refreshes the saved stack list of the load popup, if it has been created.
+
+        changed_names lets the popup update its search index for just those
+        stacks; without it every stack is compared by stackVersion.
+        """
+        if hasattr(self, "settings_panel"):
+            self.settings_panel.load_popup.reindexStacks(changed_names)
+            self.settings_panel.load_popup.loadSavedStacks()
 
 
 
@@ -689,21 +692,8 @@ class GUIGUI(QtWidgets.QWidget):
 
     def clearAllActions(self):
         """ Removes all existing actions from the UI before loading a new stack. """
-        
-        # Remove each widget in the action_rows list
-        while self.action_rows:
-            row_data = self.action_rows.pop()
-            if "widget" in row_data and row_data["widget"]:
-                row_data["widget"].setParent(None)
-                row_data["widget"].deleteLater()
-        
-        # Also clear the container layout
-        while self.dropdown_input_container.count():
-            item = self.dropdown_input_container.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        QtWidgets.QApplication.processEvents()
+        with self.bulkRowEdit():
+            self.stack_model.setActions([])
 
 
 
@@ -711,40 +701,22 @@ class GUIGUI(QtWidgets.QWidget):
 
 
     def restoreStack(self, stack_name):
-        """Loads actions from the XML and restores them into the UI."""
-        file_path = r"C:\Users\Documents\saved_stacks.xml"
-
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            print("⚠️ No saved stacks found.")
-            return
-
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-        except ET.ParseError:
-            print("❌ Error: XML file is corrupted!")
+        """Loads actions from the stack library and restores them into the UI."""
+        if self.refuseWhileRunning("load a stack"):
             return
+        actions = self.stack_store.getStack(stack_name)
 
-        stack_element = next((s for s in root.findall("Stack") if s.get("name") == stack_name), None)
-
-        if not stack_element:
-            print(f"❌ Stack '{stack_name}' not found in XML!")
+        if actions is None:
+            print(f"❌ Stack '{stack_name}' not found!")
             return
 
-        self.clearAllActions()  # Ensure UI is cleared before loading new actions
+        self.stack_versions[stack_name] = stackVersion(actions)
+        with self.bulkRowEdit():  # One relayout for the whole stack
+            self.clearAllActions()  # Ensure UI is cleared before loading new actions
 
-        for action_element in stack_element.findall("Action"):
-            action_name = action_element.get("name")
-            action_index = action_element.get("index", "")
-            action_value = action_element.get("value", "")
-
-            # Add action to UI
-            self.addActionToUI(action_name, action_index, action_value)
-
-        # ✅ After all actions are added, update input fields to reflect correct types
-        for row in self.action_rows:
-            row["dropdown"].setCurrentIndex(int(row["index_input"].text()))  # Ensures index is correctly set
-            self.updateInputField(row)  # ✅ Force update input field to match dropdown selection
+            for action in actions:
+                # Add action to UI
+                self.addActionToUI(action["name"], action["index"], action["value"])
 
         print(f"✅ Stack '{stack_name}' loaded successfully!")
         self.output_bar.setText(f"Loaded Stack: '{stack_name}'")
@@ -759,61 +731,36 @@ class GUIGUI(QtWidgets.QWidget):
 
 
     def addActionToUI(self, action_name, action_index="0", action_value=""):
-        row_widget = QtWidgets.QWidget()
-        row_layout = QtWidgets.QHBoxLayout(row_widget)
-        row_layout.setContentsMargins(5, 5, 5, 5)
-        row_layout.setSpacing(10)
-            
-        delete_button = QtWidgets.QPushButton("🗑️")
-            
-        index_input = QtWidgets.QLineEdit()
-        index_input.setPlaceholderText("#")
-        index_input.setFixedWidth(30)
-        index_input.setFixedHeight(22)
-        index_input.setText(action_index)
-            
-        dropdown = QtWidgets.QComboBox()
-        dropdown.addItems([entry["name"] for entry in self.function_definitions])
-        dropdown.setCurrentText(action_name)
-            
-        input_container = QtWidgets.QStackedWidget()
-        input_container.setFixedHeight(22)
-            
-        input_field = QtWidgets.QLineEdit()
-        input_field.setPlaceholderText("Enter value here...")
-        input_field.setText(action_value)
-        input_container.addWidget(input_field)
-            
-        row_layout.addWidget(delete_button)
-        row_layout.addWidget(index_input)
-        row_layout.addWidget(dropdown)
-        row_layout.addWidget(input_container)
-            
-        self.dropdown_input_container.addWidget(row_widget)
-            
-        row_data = {
-            "widget": row_widget,
-            "layout": row_layout,
-            "delete_btn": delete_button,
-            "index_input": index_input,
-            "dropdown": dropdown,
-            "input_container": input_container,
-            "input": input_field,
-            "saved_value": action_value
-        }
-
-        self.action_rows.append(row_data)
-        
-        # Set up the connections for index synchronization
-        dropdown.currentIndexChanged.connect(lambda index: index_input.setText(str(index)))
-        index_input.textChanged.connect(lambda text, inp=index_input, dd=dropdown: self.updateDropdownFromIndex(text, inp, dd))
-        
-        dropdown.currentIndexChanged.connect(lambda: self.updateInputField(row_data))
-        delete_button.clicked.connect(lambda: self.removeDropdownInputRow(row_data))
+        """Adds a row for a saved action and fills its inputs with the saved value.
+
+        The function is selected by name, falling back to the saved dropdown
+        index for names that are no longer in the config.
+        """
+        names = self.function_registry.names
+        if self.function_registry.indexOf(action_name) < 0 and str(action_index).strip().isdigit():
+            if int(action_index) < len(names):
+                action_name = names[int(action_index)]
+
+        input_count = len(self.rowValues(action_name))
+        saved_values = action_value.split(";", input_count - 1) if action_value else []
+        self.stack_model.insertActions(self.stack_model.rowCount(),
+                                       [self.newActionRow(action_name, action_index, saved_values)])
         
         print(f"✅ Action '{action_name}' added to UI successfully!")
 
 
+    def fillRowInputs(self, row_data, values):
+        """Put values into a row's input widgets by position; empty values keep the defaults."""
+        for widget, value in zip(row_data["input_widgets"], values):
+            value = value.strip()
+            if not value:
+                continue
+            if isinstance(widget, QtWidgets.QLineEdit):
+                widget.setText(value)
+            elif isinstance(widget, QtWidgets.QComboBox):
+                widget.setCurrentText(value)
+
+
 
 
 
@@ -823,33 +770,62 @@ class GUIGUI(QtWidgets.QWidget):
 
 
     # Remove an action row
-    def removeDropdownInputRow(self, row_data):
+    def removeDropdownInputRow(self, row):
         """Removes a row and updates the UI height dynamically."""
-        if row_data in self.action_rows:
-            self.action_rows.remove(row_data)
-            # Remove all widgets in the row and delete them
-            for key, widget in row_data.items():
-                if isinstance(widget, QtWidgets.QWidget):
-                    widget.setParent(None)
-                    widget.deleteLater()
-            # Force the layout to update its geometry
-            self.adjustSize()
-            self.updateGeometry()
-            self.resize(self.sizeHint())
+        self.removeDropdownInputRows([row])
 
-            # If the UI is unhidden, remove any fixed height so the window can shrink
-            if not self.ui_hidden:
-                # Remove fixed height by allowing the height to be determined by the layout
-                self.setMinimumHeight(0)
-                self.setMaximumHeight(16777215)
-                # Optionally, you can also update the widget’s size policy
-                self.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Preferred)
-                # And then force an update so the new size is applied
-                self.updateGeometry()
-                self.adjustSize()
-            else:
-                # When hidden, fix the height to the compressed size
-                self.setFixedHeight(self.sizeHint().height())
+
+    def removeDropdownInputRows(self, rows):
+        """Removes rows by number, bottom up, with one relayout for all of them."""
+        with self.bulkRowEdit():
+            for row in sorted(set(rows), reverse=True):
+                if 0 <= row < self.stack_model.rowCount():
+                    self.stack_model.removeActions(row, 1)
+
+
+    @contextlib.contextmanager
+    def bulkRowEdit(self):
+        """Scope for changing many rows at once.
+
+        Painting is off and per-row geometry work (fitRowView, window
+        resizing, event pumping) waits until the outermost scope ends, which
+        does it once in relayoutRows.
+        """
+        self.bulk_edit_depth += 1
+        if self.bulk_edit_depth == 1:
+            self.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            self.bulk_edit_depth -= 1
+            if self.bulk_edit_depth == 0:
+                self.setUpdatesEnabled(True)
+                self.relayoutRows()
+
+
+    def relayoutRows(self):
+        """Fit the row list and the window to the current rows."""
+        self.fitRowView()
+        self.row_view.scrollTo(self.row_view.currentIndex())
+
+        # Force the layout to update its geometry
+        self.adjustSize()
+        self.updateGeometry()
+        self.resize(self.sizeHint())
+
+        # If the UI is unhidden, remove any fixed height so the window can shrink
+        if not self.ui_hidden:
+            # Remove fixed height by allowing the height to be determined by the layout
+            self.setMinimumHeight(0)
+            self.setMaximumHeight(16777215)
+            # Optionally, you can also update the widget’s size policy
+            self.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Preferred)
+            # And then force an update so the new size is applied
+            self.updateGeometry()
+            self.adjustSize()
+        else:
+            # When hidden, fix the height to the compressed size
+            self.setFixedHeight(self.sizeHint().height())
         QtWidgets.QApplication.processEvents()
 
 
@@ -867,8 +843,141 @@ class GUIGUI(QtWidgets.QWidget):
         self.output_bar.move(0, self.height() - self.output_bar.height() - gap)
 
 
+    def collectRowActions(self):
+        """Read every action row into the action dicts compileStack expects."""
+        return [{"name": row["name"].strip(), "args": [value.strip() for value in row["values"]]}
+                for row in self.stack_model.rows]
+
+
+    def watchConfigFile(self):
+        paths = [os.path.dirname(self.xml_file)]
+        if os.path.exists(self.xml_file):
+            paths.append(self.xml_file)
+        watched = set(self.config_watcher.files() + self.config_watcher.directories())
+        missing = [p for p in paths if p not in watched and os.path.exists(p)]
+        if missing:
+            self.config_watcher.addPaths(missing)
+
+
+    def reloadFunctionConfig(self):
+        """Reload functions_config.xml if it changed and update only the rows it affects."""
+        self.watchConfigFile()
+        stamp = fileStamp(self.xml_file)
+        if stamp == self.config_stamp:
+            return
+        self.config_stamp = stamp
+
+        new_registry = FunctionRegistry.fromXML(self.xml_file)
+        old_registry = self.function_registry
+        diff = diffRegistries(old_registry, new_registry)
+        self.function_registry = new_registry
+        self.function_definitions = new_registry.definitions
+        self.invalidatePlan()
+        if not (diff.added or diff.removed or diff.changed or diff.list_changed):
+            return
+
+        # The focused row's dropdown is closed first, so the reset does not read as a new pick.
+        current = self.row_view.currentIndex()
+        if current.isValid():
+            self.row_view.closePersistentEditor(current)
+        self.function_model.setRegistry(new_registry, diff)  # Every dropdown, in one pass
+        self.input_pool.clear()  # Option lists may have changed
+
+        # Rows keep their function by name. Only rows whose function's inputs changed get new
+        # values (kept by position); that includes functions just added back to the config.
+        affected = set(diff.changed) | set(diff.added)
+        for row, action in enumerate(self.stack_model.rows):
+            name = action["name"]
+            if name in affected and old_registry.inputSpecs(name) != new_registry.inputSpecs(name):
+                self.stack_model.setAction(row, name, self.rowValues(name, action["values"]))
+        self.row_view.viewport().update()  # Dropdown indexes may have moved
+        if current.isValid():
+            self.row_view.openPersistentEditor(current)
+
+        print(f"🔄 Functions reloaded: {len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed")
+        self.output_bar.setText(f"Functions reloaded (+{len(diff.added)} -{len(diff.removed)} ~{len(diff.changed)})")
+
+
+    def invalidatePlan(self, *args):
+        """Drop the compiled plan; called whenever a row, its inputs or the config change."""
+        self.compiled_plan = None
+
+
+    def getCompiledPlan(self):
+        """Compile the current rows once and reuse the plan until something changes."""
+        if self.compiled_plan is None:
+            self.compiled_plan = compileStack(self.collectRowActions(), self.function_registry, actionsList.ACTION_FUNCTIONS)
+        return self.compiled_plan
+
+
+    def validateActions(self):
+        """Dry-run check of the current rows: marks every problem row without touching the scene."""
+        if self.refuseWhileRunning("validate"):
+            return []
+        base_style = "background-color: #1A1A2E; border: none; margin: 0px; padding: 0px; font-size: 12px;"
+        problems = validateStack(self.collectRowActions(), self.function_registry, actionsList.ACTION_FUNCTIONS)
+        problem_rows = {p["row"] for p in problems}
+        for row_index in range(self.stack_model.rowCount()):
+            self.stack_model.setStatus(row_index, QtGui.QColor(255, 200, 0, 90) if row_index in problem_rows else None)
+
+        color = "yellow" if problems else "green"
+        if self.ui_hidden:
+            self.output_bar.setStyleSheet(f"background-color: {color};")
+            self.output_bar.setText("")
+        else:
+            self.output_bar.setStyleSheet(base_style + f" color: {color};")
+            self.output_bar.setText(" | ".join(formatProblems(problems).split("\n")) if problems else "Stack is valid")
+        return problems
+
+
+    def runPlanOnce(self, plan, stack_name):
+        """Runs a compiled plan (in a transaction if enabled) and records it in the run history."""
+        if self.transactional_run:
+            with stackTransaction(pyfbsdk, f"GUIGUI: {stack_name}"):
+                result = runPlan(plan, stack_name)
+        else:
+            result = runPlan(plan, stack_name)
+        self.run_history.recordRun(result, *sceneContext(pyfbsdk))
+        return result
+
+
+    def runAllActionsOnTakes(self, pattern="*"):
+        """Runs the current rows on every take matching pattern.
+
+        The stack is compiled once and the user's take, layer, frame and
+        selection are restored once after the last take.
+        """
+        if self.refuseWhileRunning("run on takes"):
+            return []
+        base_style = "background-color: #1A1A2E; border: none; margin: 0px; padding: 0px; font-size: 12px;"
+        plan = self.getCompiledPlan()
+        stack_name = self.run_button.text().strip()
+        takes = matchTakes(pyfbsdk, pattern=pattern)
+        if not takes:
+            self.output_bar.setStyleSheet(base_style + " color: yellow;")
+            self.output_bar.setText(f"No takes match '{pattern}'")
+            return []
+
+        results = runOnTakes(pyfbsdk, takes, lambda: self.runPlanOnce(plan, stack_name))
+        failed = [r["take"] for r in results if not r["success"]]
+        if failed:
+            color, text = "red", f"Failed on {len(failed)}/{len(results)} takes: " + ", ".join(failed)
+        else:
+            color, text = "green", f"Ran on {len(results)} takes"
+        if self.ui_hidden:
+            self.output_bar.setStyleSheet(f"background-color: {color};")
+            self.output_bar.setText("")
+        else:
+            self.output_bar.setStyleSheet(base_style + f" color: {color};")
+            self.output_bar.setText(text)
+        return results
+
+
     
     def runAllActions(self):
+        """Starts a non-blocking run of the current rows; see StackStepper."""
+        if self.stepper is not None:
+            return  # Already running
         self.save_current_state()  # Save state before executing actions
         base_style = "background-color: #1A1A2E; border: none; margin: 0px; padding: 0px; font-size: 12px;"
         
@@ -878,50 +987,109 @@ class GUIGUI(QtWidgets.QWidget):
         else:
             self.output_bar.setStyleSheet(base_style + " color: white;")
             self.output_bar.setText("Running actions...")
-        
-        success = True
-        warnings = []
-        log_messages = []
-
-        for row in self.action_rows:
-            friendly_name = row["dropdown"].currentText().strip()
-            func_def = next((f for f in self.function_definitions if f["name"] == friendly_name), None)
-            if func_def is None:
-                warnings.append(f"No function definition found for '{friendly_name}'")
-                continue
-            lookup_key = func_def["definition"].strip()
-            action_func = actionsList.ACTION_FUNCTIONS.get(lookup_key)
-            if action_func is None:
-                warnings.append(f"No function found for key '{lookup_key}'")
-                continue
-            try:
-                # Gather input values based on whether there are multiple inputs or a single one.
-                if "input_widgets" in row and row["input_widgets"]:
-                    input_values = []
-                    for widget in row["input_widgets"]:
-                        if isinstance(widget, QtWidgets.QLineEdit):
-                            input_values.append(widget.text().strip())
-                        elif isinstance(widget, QtWidgets.QComboBox):
-                            input_values.append(widget.currentText().strip())
-                    result = action_func(*input_values)
-                elif "input" in row and row["input"] is not None:
-                    input_value = row["input"].text().strip()
-                    result = action_func(input_value) if input_value else action_func()
-                else:
-                    result = action_func()
-
-                if result is not None:
-                    log_messages.append(str(result))
-            except Exception as e:
-                success = False
-                row["widget"].setStyleSheet("background-color: rgba(255, 0, 0, 100);")
-                if self.ui_hidden:
-                    self.output_bar.setStyleSheet("background-color: red;")
-                    self.output_bar.setText("")
-                else:
-                    self.output_bar.setStyleSheet(base_style + " color: red;")
-                    self.output_bar.setText(f"Error in {friendly_name}: {str(e)}")
-                return
+
+        self.stack_model.clearStatus()
+
+        transaction_sdk = pyfbsdk if self.transactional_run else None
+        self.stepper = StackStepper(self.getCompiledPlan(), self.run_button.text().strip(), transaction_sdk, self)
+        self.stepper.stepStarted.connect(self.onStepStarted)
+        self.stepper.stepFinished.connect(self.onStepFinished)
+        self.stepper.finished.connect(self.onRunFinished)
+        self.setRunControlsActive(True)
+        self.stepper.start()
+
+
+    def setRunControlsActive(self, active):
+        """Swaps the Run button for Pause/Cancel while a stack is running and locks the rows.
+
+        Everything that would change the rows or the scene under the run
+        (load, run on takes, validate, bundles, stack history and the
+        transaction toggle) is disabled too; see also refuseWhileRunning.
+        """
+        self.run_button.setEnabled(not active)
+        if hasattr(self, "settings_panel"):
+            panel = self.settings_panel
+            for button in (panel.load_stack_button, panel.transaction_button, panel.validate_button,
+                           panel.takes_button, panel.bundle_button, panel.stack_history_button):
+                button.setEnabled(not active)
+            if active:
+                panel.load_popup.hide()
+        self.plus_button.setEnabled(not active)
+        self.row_view.setEnabled(not active)
+        self.pause_button.setText("Pause")
+        self.pause_button.setVisible(active)
+        self.cancel_button.setVisible(active)
+
+
+    def refuseWhileRunning(self, what):
+        """Return True, and say so, if a stepped run is in progress; what is the refused action, e.g. "load a stack".
+
+        For entry points that stay reachable during a run, such as dialogs opened before it started.
+        """
+        if self.stepper is None:
+            return False
+        print(f"⚠️ Cannot {what} while a stack is running.")
+        if not self.ui_hidden:
+            self.output_bar.setText(f"Cancel or finish the run to {what}")
+        return True
+
+
+    def togglePauseRun(self):
+        if self.stepper is None:
+            return
+        if self.stepper.paused:
+            self.stepper.resume()
+            self.pause_button.setText("Pause")
+        else:
+            self.stepper.pause()
+            self.pause_button.setText("Resume")
+            if not self.ui_hidden:
+                self.output_bar.setText(f"Paused before step {self.stepper.position + 1}/{len(self.stepper.plan.steps)}")
+
+
+    def cancelRun(self):
+        if self.stepper is not None:
+            self.stepper.cancel()
+
+
+    def onStepStarted(self, row, position, total):
+        if row < self.stack_model.rowCount():
+            self.stack_model.setStatus(row, QtGui.QColor(80, 160, 255, 90))
+            self.row_view.scrollTo(self.stack_model.index(row))
+        if not self.ui_hidden:
+            self.output_bar.setText(f"Running {position + 1}/{total}: {self.stepper.plan.steps[position].friendly_name}")
+
+
+    def onStepFinished(self, row, ok):
+        if row < self.stack_model.rowCount():
+            self.stack_model.setStatus(row, None if ok else QtGui.QColor(255, 0, 0, 100))
+
+
+    def onRunFinished(self, result):
+        self.stepper = None
+        self.setRunControlsActive(False)
+        self.run_history.recordRun(result, *sceneContext(pyfbsdk))
+        self.restore_saved_state()
+        base_style = "background-color: #1A1A2E; border: none; margin: 0px; padding: 0px; font-size: 12px;"
+        warnings = result["warnings"]
+
+        if result.get("cancelled"):
+            if self.ui_hidden:
+                self.output_bar.setStyleSheet("background-color: yellow;")
+                self.output_bar.setText("")
+            else:
+                self.output_bar.setStyleSheet(base_style + " color: yellow;")
+                self.output_bar.setText(f"Cancelled after {len(result['timings'])} step(s)")
+            return
+
+        if not result["success"]:
+            if self.ui_hidden:
+                self.output_bar.setStyleSheet("background-color: red;")
+                self.output_bar.setText("")
+            else:
+                self.output_bar.setStyleSheet(base_style + " color: red;")
+                self.output_bar.setText(result["error"])
+            return
 
         if warnings:
             if self.ui_hidden:
@@ -930,17 +1098,16 @@ class GUIGUI(QtWidgets.QWidget):
             else:
                 self.output_bar.setStyleSheet(base_style + " color: yellow;")
                 self.output_bar.setText(" | ".join(warnings))
-        elif success:
+        else:
             if self.ui_hidden:
                 self.output_bar.setStyleSheet("background-color: green;")
                 self.output_bar.setText("")
             else:
                 self.output_bar.setStyleSheet(base_style + " color: green;")
-                output_text = "\n".join(log_messages) if log_messages else "Success"
+                output_text = "\n".join(result["log_messages"]) if result["log_messages"] else "Success"
                 self.output_bar.setText(output_text)
 
 
-    restore_saved_state() 
 
 
 
@@ -950,6 +1117,497 @@ class GUIGUI(QtWidgets.QWidget):
 
 
 
+class InputEditorPool(object):
+    """Input widgets for the focused row, reused across rows and function changes.
+
+    Free widgets are kept per (input type, options), the only things a
+    widget cannot change cheaply; defaults and values are reset on reuse.
+    Each widget reports edits to on_change(widget), and widget.row_data
+    tells which row it currently belongs to. created and reused count
+    what the pool did, for benchmarkActionRows.
+    """
+
+    def __init__(self, on_change):
+        self._free = {}  # key -> [widget]
+        self._on_change = on_change
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def keyFor(spec):
+        if spec is not None and spec.input_type == "Dropdown":
+            return ("Dropdown", spec.options)
+        return ("Text", ())
+
+    def acquire(self, spec, row_data):
+        key = self.keyFor(spec)
+        free = self._free.get(key)
+        if free:
+            widget = free.pop()
+            self.reused += 1
+        else:
+            widget = self._create(key)
+            self.created += 1
+        self.reset(widget, spec)
+        widget.row_data = row_data
+        return widget
+
+    def _create(self, key):
+        if key[0] == "Dropdown":
+            widget = QtWidgets.QComboBox()
+            widget.addItems(key[1])
+            widget.currentTextChanged.connect(lambda *args: self._on_change(widget))
+        else:
+            widget = QtWidgets.QLineEdit()
+            widget.setPlaceholderText("Enter value...")
+            widget.textChanged.connect(lambda *args: self._on_change(widget))
+        widget.setFixedSize(80, 22)  # Two inputs share the space; ActionRowDelegate paints the same width
+        widget.pool_key = key
+        widget.row_data = None
+        return widget
+
+    def reset(self, widget, spec):
+        """Put a widget back to the default of spec, without reporting it as an edit."""
+        widget.blockSignals(True)
+        if isinstance(widget, QtWidgets.QComboBox):
+            widget.setCurrentIndex(max(spec.default_index, 0))
+        else:
+            widget.setText(spec.default_value if spec is not None else "")
+        widget.blockSignals(False)
+
+    def release(self, widget):
+        widget.row_data = None
+        widget.hide()
+        widget.setParent(None)
+        self._free.setdefault(widget.pool_key, []).append(widget)
+
+    def clear(self):
+        """Drop every free widget, e.g. after a config reload changed the option lists."""
+        for widgets in self._free.values():
+            for widget in widgets:
+                widget.deleteLater()
+        self._free = {}
+
+
+
+class FunctionListModel(QtGui.QStandardItemModel):
+    """The functions of the config, in dropdown order, with their descriptions as tooltips.
+
+    Built once per config load and shared by every function dropdown, so
+    opening a row builds no items and a reload updates all of them in one
+    pass. A QStandardItemModel keeps the per-item data on the C++ side,
+    where the dropdowns read it.
+    """
+
+    def __init__(self, registry, parent=None):
+        super().__init__(parent)
+        self.setRegistry(registry)
+
+    def setRegistry(self, registry, diff=None):
+        """Switch to a (reloaded) registry. With a RegistryDiff that leaves the list
+        itself unchanged, only the tooltips of the changed functions are updated."""
+        if diff is not None and not diff.list_changed:
+            for name in diff.changed:
+                self.item(registry.indexOf(name)).setToolTip(registry.byName(name).get("description", ""))
+            return
+        self.clear()
+        for name, description in zip(registry.names, registry.descriptions):
+            item = QtGui.QStandardItem(name)
+            item.setToolTip(description)
+            self.appendRow(item)
+
+
+
+class StackModel(QtCore.QAbstractListModel):
+    """The action rows of the open stack: a function name and its input values per row.
+
+    Rows are plain dicts ({"name", "index", "values"}); index is the dropdown
+    index the action was saved with, only used for names missing from the
+    config. Run and validation highlights live here too, so the view paints
+    them without any per-row widgets.
+    """
+
+    ValuesRole = QtCore.Qt.UserRole + 1  # Input values of the row, by position
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.status = []  # Highlight QColor per row, or None
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.rows):
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self.rows[index.row()]["name"]
+        if role == self.ValuesRole:
+            return self.rows[index.row()]["values"]
+        if role == QtCore.Qt.BackgroundRole:
+            return self.status[index.row()]
+        return None
+
+    def setActions(self, rows):
+        """Replace every row at once."""
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.status = [None] * len(self.rows)
+        self.endResetModel()
+
+    def insertActions(self, position, rows):
+        if not rows:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), position, position + len(rows) - 1)
+        self.rows[position:position] = rows
+        self.status[position:position] = [None] * len(rows)
+        self.endInsertRows()
+
+    def removeActions(self, first, count):
+        if count <= 0:
+            return
+        self.beginRemoveRows(QtCore.QModelIndex(), first, first + count - 1)
+        del self.rows[first:first + count]
+        del self.status[first:first + count]
+        self.endRemoveRows()
+
+    def setAction(self, row, name, values):
+        """Set the function and input values of a row; emits dataChanged only if they differ."""
+        action = self.rows[row]
+        if action["name"] == name and action["values"] == values:
+            return
+        action["name"] = name
+        action["values"] = list(values)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [QtCore.Qt.DisplayRole, self.ValuesRole])
+
+    def setStatus(self, row, color):
+        if self.status[row] == color:
+            return
+        self.status[row] = color
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [QtCore.Qt.BackgroundRole])
+
+    def clearStatus(self):
+        if any(color is not None for color in self.status):
+            self.status = [None] * len(self.rows)
+            self.dataChanged.emit(self.index(0), self.index(len(self.rows) - 1), [QtCore.Qt.BackgroundRole])
+
+
+
+class ActionRowDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints an action row the way its widgets look and builds real widgets for the focused row only.
+
+    The geometry below mirrors the layout of GUIGUI.createRowEditor, so
+    focusing a row does not move anything. Clicking the painted delete
+    button removes the row without focusing it first.
+    """
+
+    ROW_HEIGHT = 31
+    CONTROL_HEIGHT = 22
+    DELETE_WIDTH = 25
+    INDEX_WIDTH = 30
+    INPUT_WIDTH = 80
+    SPACING = 4
+
+    def __init__(self, parent_logic):
+        super().__init__(parent_logic)
+        self.parent_logic = parent_logic
+
+    def controlRects(self, rect, input_count):
+        """Return the delete, index, dropdown and input rectangles of a row."""
+        top = rect.top() + self.ROW_HEIGHT - self.CONTROL_HEIGHT - 2
+        left = rect.left() + 2
+        delete_rect = QtCore.QRect(left, top, self.DELETE_WIDTH, self.CONTROL_HEIGHT)
+        index_rect = QtCore.QRect(delete_rect.right() + 1 + self.SPACING, top, self.INDEX_WIDTH, self.CONTROL_HEIGHT)
+        input_rects = []
+        right = rect.right() - 2
+        for _ in range(input_count):
+            input_rects.insert(0, QtCore.QRect(right - self.INPUT_WIDTH + 1, top, self.INPUT_WIDTH, self.CONTROL_HEIGHT))
+            right -= self.INPUT_WIDTH + self.SPACING
+        dropdown_left = index_rect.right() + 1 + self.SPACING
+        dropdown_rect = QtCore.QRect(dropdown_left, top, right - dropdown_left + 1 - self.SPACING, self.CONTROL_HEIGHT)
+        return delete_rect, index_rect, dropdown_rect, input_rects
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        status = index.data(QtCore.Qt.BackgroundRole)
+        if status is not None:
+            painter.fillRect(rect, status)
+        painter.setPen(QtGui.QColor("gray"))
+        painter.drawLine(rect.left() + 2, rect.top() + 3, rect.right() - 2, rect.top() + 3)  # The row divider
+
+        name = index.data()
+        values = index.data(StackModel.ValuesRole)
+        delete_rect, index_rect, dropdown_rect, input_rects = self.controlRects(rect, len(values))
+        function_index = self.parent_logic.function_registry.indexOf(name)
+        box_color = QtGui.QColor(255, 255, 255, 40)
+        text_color = option.palette.color(QtGui.QPalette.Text)
+
+        painter.setPen(text_color)
+        painter.drawText(delete_rect, QtCore.Qt.AlignCenter, "🗑️")
+        for box in [index_rect, dropdown_rect] + input_rects:
+            painter.fillRect(box, box_color)
+        painter.drawText(index_rect.adjusted(4, 0, 0, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                         str(function_index) if function_index >= 0 else "")
+        if function_index < 0:
+            painter.setPen(QtGui.QColor("orange"))  # Not in functions_config.xml
+        painter.drawText(dropdown_rect.adjusted(4, 0, -4, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                         option.fontMetrics.elidedText(name, QtCore.Qt.ElideRight, dropdown_rect.width() - 8))
+        painter.setPen(text_color)
+        for box, value in zip(input_rects, values):
+            painter.drawText(box.adjusted(4, 0, -4, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                             option.fontMetrics.elidedText(value, QtCore.Qt.ElideRight, box.width() - 8))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QtCore.QEvent.MouseButtonRelease and event.button() == QtCore.Qt.LeftButton:
+            delete_rect = self.controlRects(option.rect, 0)[0]
+            if delete_rect.contains(event.position().toPoint()):
+                self.parent_logic.removeDropdownInputRow(index.row())
+                return True
+        return False
+
+    def createEditor(self, parent, option, index):
+        return self.parent_logic.createRowEditor(parent)
+
+    def setEditorData(self, editor, index):
+        self.parent_logic.loadRowEditor(editor.row_data, index)
+
+    def setModelData(self, editor, model, index):
+        self.parent_logic.storeRowEditor(editor.row_data)
+
+    def destroyEditor(self, editor, index):
+        # Stop reacting and writing back while it waits for deletion, e.g. to a function list reset.
+        editor.row_data["model_index"] = None
+        editor.row_data["dropdown"].blockSignals(True)
+        editor.row_data["index_input"].blockSignals(True)
+        self.parent_logic.releaseRowInputs(editor.row_data)  # Before they are deleted with the editor
+        super().destroyEditor(editor, index)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
+
+
+
+
+
+
+class StackStepper(QtCore.QObject):
+    """Runs a StackPlan one action per event-loop turn so the tool never freezes.
+
+    Steps are driven by a zero-interval single-shot QTimer owned by the GUI
+    thread, so every scene call stays on the main thread. Pause and cancel
+    take effect between actions.
+
+    With a transaction_sdk the run is synchronous instead: all steps run in
+    one stackTransaction without returning to the event loop. Keeping the
+    undo transaction and FBBeginChangeAllModels open across event-loop
+    turns would fold whatever the artist does in the scene meanwhile into
+    the stack's undo step, so transactional runs cannot be paused.
+    """
+
+    stepStarted = QtCore.Signal(int, int, int)  # row, position in plan, step count
+    stepFinished = QtCore.Signal(int, bool)  # row, ok
+    finished = QtCore.Signal(object)  # result dict, with "cancelled"
+
+    def __init__(self, plan, stack_name="", transaction_sdk=None, parent=None):
+        super().__init__(parent)
+        self.plan = plan
+        self.stack_name = stack_name
+        self.result = newResult(plan, stack_name)
+        self.position = 0
+        self.paused = False
+        self.cancelled = False
+        self.done = False
+        self._transaction_sdk = transaction_sdk
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._runNextStep)
+
+    def start(self):
+        if self._transaction_sdk is None:
+            self._announceNextStep()
+            return
+        with stackTransaction(self._transaction_sdk, f"GUIGUI: {self.stack_name}"):
+            for position, step in enumerate(self.plan.steps):
+                self.stepStarted.emit(step.row, position, len(self.plan.steps))
+                if not self._runStep(step):
+                    break
+        self._finish()
+
+    def pause(self):
+        self.paused = True
+        self._timer.stop()
+
+    def resume(self):
+        if self.paused and not self.done:
+            self.paused = False
+            self._timer.start()
+
+    def cancel(self):
+        # Clicks are only processed between steps, so finishing right away is safe.
+        self.cancelled = True
+        self._timer.stop()
+        self._finish()
+
+    def _announceNextStep(self):
+        # Emit before the call and let the event loop paint the highlight first.
+        if self.position < len(self.plan.steps):
+            step = self.plan.steps[self.position]
+            self.stepStarted.emit(step.row, self.position, len(self.plan.steps))
+        if not self.paused:
+            self._timer.start()
+
+    def _runNextStep(self):
+        if self.done or self.paused:
+            return
+        if self.position >= len(self.plan.steps):
+            self._finish()
+            return
+        if not self._runStep(self.plan.steps[self.position]) or self.position >= len(self.plan.steps):
+            self._finish()
+        else:
+            self._announceNextStep()
+
+    def _runStep(self, step):
+        ok = runStep(step, self.result)
+        self.position += 1
+        self.stepFinished.emit(step.row, ok)
+        return ok
+
+    def _finish(self):
+        if self.done:
+            return
+        self.done = True
+        self.result["cancelled"] = self.cancelled
+        self.finished.emit(self.result)
+
+
+
+
+
+
+class StackListModel(QtCore.QAbstractListModel):
+    """Saved stack names for LoadStackPopup's list view.
+
+    setNames diffs the new list against the shown one and emits only the
+    row inserts and removes in between, so views keep their scroll
+    position and nothing is rebuilt after a save.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.names):
+            return None
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return self.names[index.row()]
+        return None
+
+    def setNames(self, names):
+        names = list(names)
+        if names == self.names:
+            return
+        opcodes = difflib.SequenceMatcher(None, self.names, names, autojunk=False).get_opcodes()
+        # Apply from the end, so the old row numbers of earlier changes stay valid.
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag in ("delete", "replace"):
+                self.beginRemoveRows(QtCore.QModelIndex(), i1, i2 - 1)
+                del self.names[i1:i2]
+                self.endRemoveRows()
+            if tag in ("insert", "replace"):
+                self.beginInsertRows(QtCore.QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self.names[i1:i1] = names[j1:j2]
+                self.endInsertRows()
+
+
+
+class StackFilterProxy(QtCore.QSortFilterProxyModel):
+    """Hides the stacks that are not in matches; None shows them all."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matches = None
+
+    def setMatches(self, matches):
+        self.matches = matches
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.matches is None:
+            return True
+        return self.sourceModel().names[source_row] in self.matches
+
+
+
+class StackItemDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints a stack row as its name plus Dup and Del buttons; no widgets per row.
+
+    Clicking the name restores the stack, clicking a button emits its signal.
+    """
+
+    restoreRequested = QtCore.Signal(str)
+    duplicateRequested = QtCore.Signal(str)
+    deleteRequested = QtCore.Signal(str)
+
+    ROW_HEIGHT = 30
+    BUTTON_WIDTH = 30
+
+    def buttonRects(self, rect):
+        """Return the (Dup, Del) rectangles inside a row."""
+        delete_rect = QtCore.QRect(rect.right() - self.BUTTON_WIDTH - 4, rect.top(), self.BUTTON_WIDTH, rect.height())
+        duplicate_rect = delete_rect.translated(-self.BUTTON_WIDTH - 6, 0)
+        return duplicate_rect, delete_rect
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QtWidgets.QStyle.State_MouseOver:
+            painter.fillRect(option.rect, QtGui.QColor(255, 255, 255, 25))
+        duplicate_rect, delete_rect = self.buttonRects(option.rect)
+
+        font = QtGui.QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QtGui.QColor("white"))
+        text_rect = option.rect.adjusted(4, 0, -(option.rect.right() - duplicate_rect.left() + 6), 0)
+        name = option.fontMetrics.elidedText(index.data(), QtCore.Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, name)
+
+        painter.setFont(option.font)
+        painter.setPen(QtGui.QColor("lightblue"))
+        painter.drawText(duplicate_rect, QtCore.Qt.AlignCenter, "Dup")
+        painter.setPen(QtGui.QColor("red"))
+        painter.drawText(delete_rect, QtCore.Qt.AlignCenter, "Del")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QtCore.QEvent.MouseButtonRelease or event.button() != QtCore.Qt.LeftButton:
+            return False
+        name = index.data()
+        duplicate_rect, delete_rect = self.buttonRects(option.rect)
+        pos = event.position().toPoint()
+        if duplicate_rect.contains(pos):
+            self.duplicateRequested.emit(name)
+        elif delete_rect.contains(pos):
+            self.deleteRequested.emit(name)
+        else:
+            self.restoreRequested.emit(name)
+        return True
+
 
 
 
@@ -994,88 +1652,97 @@ class LoadStackPopup(QtWidgets.QFrame):
         layout.setContentsMargins(5, 5, 5, 5)
         layout.setSpacing(5)
 
-        self.scroll_area = QtWidgets.QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        layout.addWidget(self.scroll_area)
+        self.search_index = StackSearchIndex()  # Filled when the popup opens, never while typing
+        self.stack_versions = {}  # stackVersion of every indexed stack, to spot changes made elsewhere
+        self.search_box = QtWidgets.QLineEdit()
+        self.search_box.setPlaceholderText("Search stacks, actions, values (action:, value:, name:)")
+        self.search_box.setStyleSheet("color: white; background-color: rgba(255, 255, 255, 30);")
+        self.search_box.textChanged.connect(self.filterStacks)
+        layout.addWidget(self.search_box)
 
-        self.list_container = QtWidgets.QWidget()
-        self.list_layout = QtWidgets.QVBoxLayout(self.list_container)
-        self.list_layout.setContentsMargins(2, 2, 2, 2)
-        self.list_layout.setSpacing(4)
-        self.scroll_area.setWidget(self.list_container)
+        # Rows are painted by the delegate, and only the visible ones, however many stacks there are.
+        self.stack_model = StackListModel(self)
+        self.stack_filter = StackFilterProxy(self)
+        self.stack_filter.setSourceModel(self.stack_model)
+        self.stack_delegate = StackItemDelegate(self)
+        self.stack_delegate.restoreRequested.connect(self.restoreStack)
+        self.stack_delegate.duplicateRequested.connect(self.duplicateStack)
+        self.stack_delegate.deleteRequested.connect(self.deleteStack)
 
-        self.loadSavedStacks()
+        self.stack_view = QtWidgets.QListView(self)
+        self.stack_view.setModel(self.stack_filter)
+        self.stack_view.setItemDelegate(self.stack_delegate)
+        self.stack_view.setUniformItemSizes(True)  # Lets the view skip measuring every row
+        self.stack_view.setMouseTracking(True)  # For the hover highlight
+        self.stack_view.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.stack_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.stack_view.setStyleSheet("QListView { background-color: transparent; border: none; }")
+        layout.addWidget(self.stack_view)
+
+        self.refreshIfChanged()
 
 
 
 
 
     def loadSavedStacks(self):
-        while self.list_layout.count():
-            item = self.list_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        for stack_name in self.getSavedStacks():
-            item = self.createStackItem(stack_name)  # Now this function exists
-            self.list_layout.addWidget(item)
-        self.list_layout.addStretch()
-
-    def createStackItem(self, stack_name):
-        item_widget = QtWidgets.QWidget()
-        hlayout = QtWidgets.QHBoxLayout(item_widget)
-        hlayout.setContentsMargins(4, 4, 4, 4)
-        hlayout.setSpacing(6)
-        
-        # Label for the stack name
-        label = QtWidgets.QLabel(stack_name)
-        label.setStyleSheet("color: white; font-weight: bold;")
-        hlayout.addWidget(label)
-        
-        # Duplicate button
-        duplicate_button = QtWidgets.QPushButton("Dup")
-        duplicate_button.setFixedSize(30, 30)
-        duplicate_button.setStyleSheet("background-color: transparent; color: lightblue;")
-        duplicate_button.clicked.connect(lambda: self.duplicateStack(stack_name))
-        hlayout.addWidget(duplicate_button)
-        
-        # Delete button
-        delete_button = QtWidgets.QPushButton("Del")
-        delete_button.setFixedSize(30, 30)
-        delete_button.setStyleSheet("background-color: transparent; color: red;")
-        delete_button.clicked.connect(lambda: self.deleteStack(stack_name))
-        hlayout.addWidget(delete_button)
-        
-        # Clicking the label will also restore the stack.
-        label.mousePressEvent = lambda event: self.restoreStack(stack_name)
-        
-        return item_widget
+        """Bring the list in line with the library; only added and removed rows change."""
+        self.stack_model.setNames(self.getSavedStacks())
+        self.filterStacks(self.search_box.text())
+
+    def refreshIfChanged(self):
+        """Bring the list and search index in line with the library when the popup opens.
+
+        Stacks are compared by stackVersion, so an edit made in another
+        GUIGUI is picked up even when the names stay the same; only the
+        stacks that changed are reindexed.
+        """
+        stacks = self.getAllStacks()
+        versions = {name: stackVersion(actions) for name, actions in stacks}
+        for name, actions in stacks:
+            if self.stack_versions.get(name) != versions[name]:
+                self.search_index.addStack(name, actions)
+        for name in set(self.stack_versions) - set(versions):
+            self.search_index.removeStack(name)
+        self.stack_versions = versions
+        if [name for name, _ in stacks] != self.stack_model.names:
+            self.loadSavedStacks()
+        else:
+            self.filterStacks(self.search_box.text())
+
+    def reindexStacks(self, names=None):
+        """Update the search index for stacks we just changed, or resync everything when names is None."""
+        if names is None or self.parent_logic is None:
+            self.refreshIfChanged()
+            return
+        for name in names:
+            actions = self.parent_logic.stack_store.getStack(name)
+            if actions is None:
+                self.search_index.removeStack(name)
+                self.stack_versions.pop(name, None)
+            else:
+                self.search_index.addStack(name, actions)
+                self.stack_versions[name] = stackVersion(actions)
+
+    def filterStacks(self, text):
+        """Show only the stacks matching the search box; every term must match the start of a word."""
+        text = text.strip()
+        if not text:
+            self.stack_filter.setMatches(None)
+            return
+        self.stack_filter.setMatches(set(self.search_index.search(text)))
 
     def duplicateStack(self, stack_name):
         new_name, ok = QtWidgets.QInputDialog.getText(self, "Duplicate Stack", "Enter new name for duplicated stack:")
         if not ok or not new_name.strip():
             return
         new_name = new_name.strip()
-        file_path = r"C:\Users\Documents\saved_stacks.xml"
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            stack_node = next((s for s in root.findall("Stack") if s.get("name") == stack_name), None)
-            if stack_node is None:
-                QtWidgets.QMessageBox.warning(self, "Error", f"Stack '{stack_name}' not found.")
+            if not self.parent_logic.stack_store.duplicateStack(stack_name, new_name):
+                QtWidgets.QMessageBox.warning(self, "Error", f"Stack '{stack_name}' not found or '{new_name}' already exists.")
                 return
-            # Create a duplicate element with new name.
-            new_stack = ET.Element("Stack", name=new_name)
-            for child in stack_node:
-                new_stack.append(child)
-            root.append(new_stack)
-            ET.indent(root, space="  ", level=0)
-            new_xml = ET.tostring(root, encoding="unicode")
-            new_xml = "\n".join([line for line in new_xml.split("\n") if line.strip()])
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(new_xml)
             QtWidgets.QMessageBox.information(self, "Success", f"Stack '{stack_name}' duplicated as '{new_name}'.")
+            self.reindexStacks([new_name])
             self.loadSavedStacks()
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, "Error", f"Error duplicating stack:\n{e}")
@@ -1086,8 +1753,6 @@ class LoadStackPopup(QtWidgets.QFrame):
         """Ensure index updates properly when loading any stack."""
         if self.parent_logic and hasattr(self.parent_logic, "restoreStack"):
             self.parent_logic.restoreStack(stack_name)
-            for row in self.parent_logic.action_rows:
-                row["index_input"].setText(str(row["dropdown"].currentIndex()))
             print(f"✅ Stack '{stack_name}' loaded successfully!")
 
             self.hide()
@@ -1103,45 +1768,239 @@ class LoadStackPopup(QtWidgets.QFrame):
 
 
     def getSavedStacks(self):
-        stacks = []
-        file_path = r"C:\Users\Documents\saved_stacks.xml"
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-                for stack in root.findall("Stack"):
-                    name = stack.get("name")
-                    if name:
-                        stacks.append(name)
-            except Exception as e:
-                print("Error loading XML:", e)
-        return stacks
+        if self.parent_logic is None:
+            return []
+        try:
+            return self.parent_logic.stack_store.listNames()
+        except Exception as e:
+            print("Error loading stacks:", e)
+            return []
+
+    def getAllStacks(self):
+        if self.parent_logic is None:
+            return []
+        try:
+            return self.parent_logic.stack_store.allStacks()
+        except Exception as e:
+            print("Error loading stacks:", e)
+            return []
 
     def deleteStack(self, stack_name):
-        file_path = r"C:\UsersDocuments\saved_stacks.xml"
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            try:
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-                for stack in root.findall("Stack"):
-                    if stack.get("name") == stack_name:
-                        root.remove(stack)
-
-                xml_str = ET.tostring(root, encoding="utf-8")
-                dom = xml.dom.minidom.parseString(xml_str)
-                pretty_xml = dom.toprettyxml(indent="  ")
-                pretty_xml = "\n".join([line for line in pretty_xml.split("\n") if line.strip()])
-
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(pretty_xml)
-            except Exception as e:
-                print("Error deleting stack:", e)
+        try:
+            self.parent_logic.stack_store.deleteStack(stack_name)
+        except Exception as e:
+            print("Error deleting stack:", e)
+        self.reindexStacks([stack_name])
         self.loadSavedStacks()
 
 
 
 
 
+class RunHistoryDialog(QtWidgets.QDialog):
+    """Shows p50/p95 timings per action across every recorded run."""
+
+    def __init__(self, run_history, parent=None):
+        super().__init__(parent)
+        self.run_history = run_history
+        self.setWindowTitle("Run History")
+        self.resize(460, 300)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.stack_filter = QtWidgets.QLineEdit()
+        self.stack_filter.setPlaceholderText("Filter by stack name (empty for all)")
+        self.stack_filter.returnPressed.connect(self.refresh)
+        layout.addWidget(self.stack_filter)
+
+        headers = ["Action", "Runs", "p50 ms", "p95 ms", "Max ms"]
+        self.table = QtWidgets.QTableWidget(0, len(headers), self)
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        refresh_button = QtWidgets.QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        layout.addWidget(refresh_button)
+
+        self.refresh()
+
+    def refresh(self):
+        stats = self.run_history.actionStats(self.stack_filter.text().strip() or None)
+        rows = sorted(stats.items(), key=lambda item: -item[1]["p95_ms"])  # Slowest first
+        self.table.setRowCount(len(rows))
+        for row, (key, s) in enumerate(rows):
+            values = [key, str(s["count"]), f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}", f"{s['max_ms']:.2f}"]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QtWidgets.QTableWidgetItem(value))
+
+
+
+
+
+
+class StackBundleDialog(QtWidgets.QDialog):
+    """Exports selected stacks, or the whole library, to a bundle and imports bundles."""
+
+    FILE_FILTER = f"Stack bundles (*{BUNDLE_EXTENSION})"
+
+    def __init__(self, parent_logic, parent=None):
+        super().__init__(parent)
+        self.parent_logic = parent_logic
+        self.setWindowTitle("Stack Bundles")
+        self.resize(320, 400)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.stack_list = QtWidgets.QListWidget()
+        self.stack_list.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        layout.addWidget(self.stack_list)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        export_selected_button = QtWidgets.QPushButton("Export Selected...")
+        export_selected_button.clicked.connect(lambda: self.exportStacks(selected_only=True))
+        export_all_button = QtWidgets.QPushButton("Export All...")
+        export_all_button.clicked.connect(lambda: self.exportStacks(selected_only=False))
+        import_button = QtWidgets.QPushButton("Import...")
+        import_button.clicked.connect(self.importStacks)
+        button_layout.addWidget(export_selected_button)
+        button_layout.addWidget(export_all_button)
+        button_layout.addWidget(import_button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self):
+        self.stack_list.clear()
+        self.stack_list.addItems(self.parent_logic.stack_store.listNames())
+
+    def exportStacks(self, selected_only):
+        names = [item.text() for item in self.stack_list.selectedItems()] if selected_only else None
+        if selected_only and not names:
+            QtWidgets.QMessageBox.information(self, "Export", "Select one or more stacks first.")
+            return
+        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Stacks", "stacks" + BUNDLE_EXTENSION,
+                                                             self.FILE_FILTER)
+        if not file_path:
+            return
+        count = exportBundle(self.parent_logic.stack_store, file_path, self.parent_logic.function_registry, names)
+        print(f"✅ Exported {count} stack(s) to {file_path}")
+
+    def importStacks(self):
+        if self.parent_logic.refuseWhileRunning("import stacks"):
+            return
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import Stacks", "", self.FILE_FILTER)
+        if not file_path:
+            return
+        try:
+            report = importBundle(self.parent_logic.stack_store, file_path, self.parent_logic.function_registry)
+        except StackConflictError as e:
+            QtWidgets.QMessageBox.warning(self, "Import Failed",
+                                          f"Nothing was imported: {e}.\nAnother session changed the library; import again.")
+            return
+        except (OSError, EOFError, ValueError) as e:  # EOFError: truncated gzip
+            QtWidgets.QMessageBox.warning(self, "Import Failed", str(e))
+            return
+        QtWidgets.QMessageBox.information(self, "Import", formatImportReport(report))
+
+        missing = report["missing_functions"]
+        if missing:
+            reply = QtWidgets.QMessageBox.question(
+                self, "Add Functions",
+                f"The bundle uses {len(missing)} function(s) that are not in your config.\n"
+                f"Add their definitions to {self.parent_logic.xml_file}?"
+            )
+            if reply == QtWidgets.QMessageBox.Yes:
+                appendFunctionDefinitions(self.parent_logic.xml_file, missing)
+                print(f"✅ Added {len(missing)} function definition(s).")  # The config watcher reloads the dropdowns
+
+        self.refresh()
+        self.parent_logic.refreshLoadPopup()
+
+
+
+
+
+
+class StackHistoryDialog(QtWidgets.QDialog):
+    """Lists the saved revisions of every stack, deleted ones included, and rolls a stack back."""
+
+    def __init__(self, parent_logic, parent=None):
+        super().__init__(parent)
+        self.parent_logic = parent_logic
+        self.store = parent_logic.stack_store
+        self.setWindowTitle("Stack History")
+        self.resize(560, 400)
+
+        layout = QtWidgets.QHBoxLayout(self)
+        self.stack_list = QtWidgets.QListWidget()
+        self.stack_list.currentTextChanged.connect(self.showRevisions)
+        layout.addWidget(self.stack_list, 1)
+
+        right_layout = QtWidgets.QVBoxLayout()
+        self.revision_list = QtWidgets.QListWidget()
+        self.revision_list.currentRowChanged.connect(self.showRevision)
+        right_layout.addWidget(self.revision_list, 1)
+        self.preview = QtWidgets.QPlainTextEdit()
+        self.preview.setReadOnly(True)
+        right_layout.addWidget(self.preview, 1)
+        self.restore_button = QtWidgets.QPushButton("Restore This Version")
+        self.restore_button.setEnabled(False)
+        self.restore_button.clicked.connect(self.restoreRevision)
+        right_layout.addWidget(self.restore_button)
+        layout.addLayout(right_layout, 2)
+
+        self.revisions = []
+        if self.store.history is None:
+            self.preview.setPlainText("This stack library has no history.")
+            return
+        live = set(self.store.listNames())
+        for name in self.store.history.names():
+            item = QtWidgets.QListWidgetItem(name if name in live else f"{name} (deleted)")
+            item.setData(QtCore.Qt.UserRole, name)
+            self.stack_list.addItem(item)
+
+    def currentName(self):
+        item = self.stack_list.currentItem()
+        return item.data(QtCore.Qt.UserRole) if item else None
+
+    def showRevisions(self, *args):
+        self.revision_list.clear()
+        self.preview.clear()
+        name = self.currentName()
+        self.revisions = self.store.stackHistory(name) if name else []
+        for revision in self.revisions:
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(revision.saved_at)) if revision.saved_at else "before history"
+            self.revision_list.addItem(f"{when}  {revision.version or 'deleted'}")
+
+    def showRevision(self, row):
+        revision = self.revisions[row] if 0 <= row < len(self.revisions) else None
+        actions = self.store.history.getRevision(revision.version) if revision and revision.version else None
+        self.restore_button.setEnabled(actions is not None and row > 0)  # The newest revision is what is stored now
+        if actions is None:
+            self.preview.setPlainText("Deleted." if revision else "")
+            return
+        self.preview.setPlainText("\n".join(f"{a['name']}: {a['value']}" for a in actions))
+
+    def restoreRevision(self):
+        if self.parent_logic.refuseWhileRunning("restore a stack version"):
+            return
+        name = self.currentName()
+        row = self.revision_list.currentRow()
+        if name is None or not 0 <= row < len(self.revisions):
+            return
+        if self.store.rollbackStack(name, self.revisions[row].version):
+            print(f"✅ Stack '{name}' restored to version {self.revisions[row].version}")
+            self.stack_list.currentItem().setText(name)  # No longer deleted, if it was
+            self.parent_logic.refreshLoadPopup([name])
+            self.showRevisions()
+        else:
+            print(f"❌ Version {self.revisions[row].version} of '{name}' is not in the history.")
+
+
+
+
+
+
 class SettingsPanel(QtWidgets.QWidget):
     def __init__(self, parent_logic=None):
         super().__init__(parent_logic)
@@ -1161,6 +2020,44 @@ class SettingsPanel(QtWidgets.QWidget):
         self.load_stack_button.setFixedSize(30, 30)
         layout.addWidget(self.load_stack_button)
 
+        self.transaction_button = QtWidgets.QPushButton("⎌")
+        self.transaction_button.setFixedSize(30, 30)
+        self.transaction_button.setCheckable(True)
+        self.transaction_button.setToolTip("Run the stack as one undo step with a single evaluation\n"
+                                           "(runs in one go: the tool is busy and Pause is unavailable)")
+        self.transaction_button.toggled.connect(self.setTransactionalRun)
+        layout.addWidget(self.transaction_button)
+
+        self.validate_button = QtWidgets.QPushButton("✔")
+        self.validate_button.setFixedSize(30, 30)
+        self.validate_button.setToolTip("Check every row without running anything")
+        self.validate_button.clicked.connect(lambda: self.parent_logic.validateActions())
+        layout.addWidget(self.validate_button)
+
+        self.takes_button = QtWidgets.QPushButton("🎞")
+        self.takes_button.setFixedSize(30, 30)
+        self.takes_button.setToolTip("Run the stack on every take matching a name pattern")
+        self.takes_button.clicked.connect(self.promptRunOnTakes)
+        layout.addWidget(self.takes_button)
+
+        self.history_button = QtWidgets.QPushButton("⏱")
+        self.history_button.setFixedSize(30, 30)
+        self.history_button.setToolTip("Action timings across runs")
+        self.history_button.clicked.connect(self.showRunHistory)
+        layout.addWidget(self.history_button)
+
+        self.bundle_button = QtWidgets.QPushButton("📦")
+        self.bundle_button.setFixedSize(30, 30)
+        self.bundle_button.setToolTip("Export or import stack bundles")
+        self.bundle_button.clicked.connect(self.showStackBundles)
+        layout.addWidget(self.bundle_button)
+
+        self.stack_history_button = QtWidgets.QPushButton("🕘")
+        self.stack_history_button.setFixedSize(30, 30)
+        self.stack_history_button.setToolTip("Earlier versions of saved stacks")
+        self.stack_history_button.clicked.connect(self.showStackHistory)
+        layout.addWidget(self.stack_history_button)
+
         # Replace the close button with an "Add Function" button.
         self.add_function_button = QtWidgets.QPushButton("➕")
         self.add_function_button.setFixedSize(30, 30)
@@ -1185,6 +2082,37 @@ class SettingsPanel(QtWidgets.QWidget):
         launch_xml_creator()
         
 
+    def promptRunOnTakes(self):
+        pattern, ok = QtWidgets.QInputDialog.getText(
+            self, "Run On Takes", "Take name pattern (* and ? wildcards):", text="*"
+        )
+        if not ok or not pattern.strip():
+            return
+        self.parent_logic.runAllActionsOnTakes(pattern.strip())
+
+
+    def setTransactionalRun(self, checked):
+        self.parent_logic.transactional_run = checked
+
+
+    def showRunHistory(self):
+        dialog = RunHistoryDialog(self.parent_logic.run_history, self.parent_logic)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        dialog.show()
+
+
+    def showStackBundles(self):
+        dialog = StackBundleDialog(self.parent_logic, self.parent_logic)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        dialog.show()
+
+
+    def showStackHistory(self):
+        dialog = StackHistoryDialog(self.parent_logic, self.parent_logic)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        dialog.show()
+
+
     def promptSaveStack(self):
         """Uses Run button name as the stack name, or asks for a name if it's 'Run'."""
         run_button_name = self.parent_logic.run_button.text().strip()
@@ -1212,6 +2140,7 @@ class SettingsPanel(QtWidgets.QWidget):
         # Position the popup to the left of the load button
         x = global_pos.x() - self.load_popup.width()
         y = global_pos.y()
+        self.load_popup.refreshIfChanged()
         self.load_popup.move(x, y)
         self.load_popup.show()
 
@@ -1219,6 +2148,7 @@ class SettingsPanel(QtWidgets.QWidget):
         if source == self.load_stack_button:
             if event.type() == QtCore.QEvent.Enter:
                 pos = self.load_stack_button.mapToGlobal(QtCore.QPoint(-self.load_popup.width(), 0))
+                self.load_popup.refreshIfChanged()
                 self.load_popup.move(pos)
                 self.load_popup.show()
             elif event.type() == QtCore.QEvent.Leave:
@@ -1232,6 +2162,85 @@ class SettingsPanel(QtWidgets.QWidget):
             
    
 
+def benchmarkActionRows(tool, row_counts=(10, 100, 1000)):
+    """Time loading row_counts actions into the tool, scrolling through them, focusing rows, bulk row operations
+    and changing functions, and count the widgets."""
+    names = tool.function_registry.names or ["Missing Function"]
+    for count in row_counts:
+        tool.clearAllActions()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(None):
+            for i in range(count):
+                tool.addActionToUI(names[i % len(names)], str(i % len(names)), "")
+        QtWidgets.QApplication.processEvents()
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for row in range(0, count, MAX_VISIBLE_ROWS):
+            tool.row_view.scrollTo(tool.stack_model.index(row))
+            tool.row_view.viewport().repaint()
+        scrolled = time.perf_counter() - start
+
+        focused = min(count, 100)
+        start = time.perf_counter()
+        for row in range(focused):
+            tool.row_view.setCurrentIndex(tool.stack_model.index(row))
+        QtWidgets.QApplication.processEvents()
+        per_focus = (time.perf_counter() - start) / max(focused, 1)
+
+        QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)  # Closed editors
+        widgets = len(tool.row_view.findChildren(QtWidgets.QWidget))
+        print(f"{count:>5} rows: built in {built * 1000:8.1f} ms, scrolled through in {scrolled * 1000:8.1f} ms, "
+              f"{per_focus * 1000:5.2f} ms to focus a row, {widgets} widgets in the row list")
+
+    # Bulk row operations, through a throwaway library so the user's stacks are left alone.
+    import tempfile
+    user_store = tool.stack_store
+    tool.stack_store = openStackStore(os.path.join(tempfile.mkdtemp(), "benchmark_stacks.db"))
+    try:
+        for count in row_counts:
+            tool.stack_store.upsertStack("Benchmark", [
+                {"name": names[i % len(names)], "index": str(i % len(names)), "value": ""} for i in range(count)
+            ])
+            with contextlib.redirect_stdout(None):
+                start = time.perf_counter()
+                tool.restoreStack("Benchmark")
+                loaded = time.perf_counter() - start
+                start = time.perf_counter()
+                tool.removeDropdownInputRows(range(0, count, 2))
+                deleted = time.perf_counter() - start
+                start = time.perf_counter()
+                tool.clearAllActions()
+                cleared = time.perf_counter() - start
+            print(f"{count:>5} rows: loaded in {loaded * 1000:8.1f} ms, every other row deleted in {deleted * 1000:8.1f} ms, "
+                  f"cleared in {cleared * 1000:6.1f} ms")
+    finally:
+        tool.stack_store = user_store
+    tool.addDropdownInputRow()
+
+    # Change the function of the focused row through every function, as when paging through the index box.
+    changes = max(len(names) * 5, 100)
+    tool.row_view.setCurrentIndex(tool.stack_model.index(0))
+    row_data = tool.row_view.indexWidget(tool.stack_model.index(0)).row_data
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    created = tool.input_pool.created
+    widgets = len(QtWidgets.QApplication.allWidgets())
+    start = time.perf_counter()
+    for i in range(changes):
+        row_data["index_input"].setText(str(i % len(names)))
+    QtWidgets.QApplication.processEvents()
+    per_change = (time.perf_counter() - start) / changes
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    print(f"{changes} function changes: {per_change * 1000:.2f} ms each, "
+          f"{(tool.input_pool.created - created) / changes:.2f} input widgets created per change, "
+          f"{len(QtWidgets.QApplication.allWidgets()) - widgets} widgets left over")
+
+
+
 # Create and show the tool as a standalone window
 tool = GUIGUI()
 tool.show()
+
+# Set GUIGUI_BENCHMARK_ROWS=1 to time building and scrolling large stacks on startup.
+if os.environ.get("GUIGUI_BENCHMARK_ROWS", "") not in ("", "0"):
+    benchmarkActionRows(tool)
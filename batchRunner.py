@@ -0,0 +1,175 @@
+import argparse
+import glob
+import importlib
+import multiprocessing
+import os
+import time
+
+from stackEngine import StackEngine, CONFIG_FILE, STACKS_FILE
+from stackValidation import formatProblems
+
+
+SCENE_EXTENSIONS = (".fbx",)
+
+# Per-process state, set up once by _initWorker in every pool worker.
+_worker_sdk = None
+_worker_engine = None
+_worker_stack_name = None
+
+
+
+def collectSceneFiles(path_or_glob):
+    """Return the sorted scene files for a directory or a glob pattern."""
+    if os.path.isdir(path_or_glob):
+        files = [
+            os.path.join(path_or_glob, name)
+            for name in os.listdir(path_or_glob)
+            if name.lower().endswith(SCENE_EXTENSIONS)
+        ]
+    else:
+        files = [f for f in glob.glob(path_or_glob) if os.path.isfile(f)]
+    return sorted(os.path.abspath(f) for f in files)
+
+
+
+def _initWorker(stack_name, config_file, stacks_file, sdk_module, actions_module):
+    """Pool initializer: every worker gets its own SDK session and engine."""
+    global _worker_sdk, _worker_engine, _worker_stack_name
+    _worker_sdk = importlib.import_module(sdk_module)
+    action_functions = importlib.import_module(actions_module).ACTION_FUNCTIONS
+    _worker_engine = StackEngine(config_file, stacks_file, action_functions, sdk=_worker_sdk)
+    _worker_stack_name = stack_name
+
+
+
+def _validateWorkerStack():
+    """Validate the batch stack inside a worker, where the action callables can be imported."""
+    return _worker_engine.validateStack(_worker_stack_name)
+
+
+
+def _runSceneFile(file_path):
+    """Open one scene in this worker's session and run the batch stack on it.
+
+    Errors are recorded in the file's result, so one bad file never stops the batch.
+    """
+    result = {
+        "file": file_path,
+        "worker": os.getpid(),
+        "success": False,
+        "warnings": [],
+        "error": None,
+        "open_seconds": 0.0,
+        "run_seconds": 0.0
+    }
+
+    start = time.perf_counter()
+    try:
+        opened = _worker_sdk.FBApplication().FileOpen(file_path)
+    except Exception as e:
+        opened = False
+        result["error"] = f"Error opening scene: {e}"
+    result["open_seconds"] = time.perf_counter() - start
+    if not opened:
+        result["error"] = result["error"] or "Scene could not be opened"
+        return result
+
+    start = time.perf_counter()
+    try:
+        run = _worker_engine.runStack(_worker_stack_name)
+    except Exception as e:
+        result["run_seconds"] = time.perf_counter() - start
+        result["error"] = f"Error running stack: {e}"
+        return result
+    result["run_seconds"] = time.perf_counter() - start
+    result["success"] = run["success"]
+    result["warnings"] = run["warnings"]
+    result["error"] = run["error"]
+    return result
+
+
+
+def runBatch(stack_name, path_or_glob, workers=4, config_file=CONFIG_FILE, stacks_file=STACKS_FILE,
+             sdk_module="pyfbsdk", actions_module="actionsList", python_executable=None):
+    """Run one saved stack over every scene matched by path_or_glob.
+
+    Files are handed out one at a time to a pool of worker processes, each
+    importing sdk_module and actions_module itself, so a stand-in SDK can be
+    used outside MotionBuilder. python_executable points the pool at an
+    SDK-enabled interpreter such as mobupy.
+
+    The stack is validated in a worker before any scene is opened; if it
+    has problems the report lists them and no file is touched.
+
+    Returns a report dict with one result per file, in file order.
+    """
+    files = collectSceneFiles(path_or_glob)
+    report = {
+        "stack_name": stack_name,
+        "workers": workers,
+        "files": [],
+        "succeeded": 0,
+        "failed": 0,
+        "problems": [],
+        "wall_seconds": 0.0
+    }
+    if not files:
+        return report
+
+    context = multiprocessing.get_context("spawn")
+    if python_executable:
+        context.set_executable(python_executable)
+
+    start = time.perf_counter()
+    initargs = (stack_name, config_file, stacks_file, sdk_module, actions_module)
+    with context.Pool(processes=max(1, min(workers, len(files))), initializer=_initWorker, initargs=initargs) as pool:
+        report["problems"] = pool.apply(_validateWorkerStack)
+        if report["problems"]:
+            report["wall_seconds"] = time.perf_counter() - start
+            return report
+        results = list(pool.imap_unordered(_runSceneFile, files, chunksize=1))
+    report["wall_seconds"] = time.perf_counter() - start
+
+    order = {f: i for i, f in enumerate(files)}
+    report["files"] = sorted(results, key=lambda r: order[r["file"]])
+    report["succeeded"] = sum(1 for r in results if r["success"])
+    report["failed"] = len(results) - report["succeeded"]
+    return report
+
+
+
+def formatBatchReport(report):
+    """Render a batch report as a plain-text table."""
+    lines = [f"Stack '{report['stack_name']}' over {len(report['files'])} file(s) "
+             f"with {report['workers']} worker(s): {report['succeeded']} ok, {report['failed']} failed, "
+             f"{report['wall_seconds']:.2f}s wall"]
+    if report.get("problems"):
+        lines.append("Stack rejected before opening any scene:")
+        lines.append(formatProblems(report["problems"]))
+    for r in report["files"]:
+        status = "OK  " if r["success"] else "FAIL"
+        line = f"{status} {r['open_seconds']:7.2f}s open {r['run_seconds']:7.2f}s run  {r['file']}"
+        if r["error"]:
+            line += f"  ({r['error']})"
+        elif r["warnings"]:
+            line += f"  ({' | '.join(r['warnings'])})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a saved GUIGUI stack over a folder of scenes.")
+    parser.add_argument("stack_name")
+    parser.add_argument("scenes", help="Directory of .fbx files or a glob pattern")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--stacks", default=STACKS_FILE)
+    parser.add_argument("--sdk-module", default="pyfbsdk")
+    parser.add_argument("--actions-module", default="actionsList")
+    parser.add_argument("--python", default=None, help="Interpreter for the workers, e.g. mobupy")
+    args = parser.parse_args()
+
+    batch = runBatch(args.stack_name, args.scenes, args.workers, args.config, args.stacks,
+                     args.sdk_module, args.actions_module, args.python)
+    print(formatBatchReport(batch))
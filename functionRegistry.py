@@ -0,0 +1,246 @@
+import os
+import pickle
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+from stackCache import fileStamp
+
+
+# A parsed <Input>: options are split once here instead of on every dropdown
+# change, and default_index is the position of the default in options (-1 if absent).
+InputSpec = namedtuple("InputSpec", ["input_type", "default_value", "options", "default_index"])
+
+# What changed between two loads of the config, as tuples of friendly names.
+RegistryDiff = namedtuple("RegistryDiff", ["added", "removed", "changed", "list_changed"])
+
+# Bump when the cached definitions or InputSpec change shape, so old caches are rebuilt.
+CONFIG_CACHE_VERSION = 1
+# Set GUIGUI_CONFIG_TIMING=1 to print parse versus cache-hit times.
+REPORT_CONFIG_TIMING = os.environ.get("GUIGUI_CONFIG_TIMING", "") not in ("", "0")
+
+
+
+def loadFunctionDefinitionsFromXML(xml_file):
+    """Load function definitions from the given XML file.
+
+    Each <Function> element in the XML is converted to a dictionary with keys:
+    - name: the Function name attribute
+    - definition: the text inside the <Definition> element
+    - input_type: from the <Input> element's type attribute (if present)
+    - default_value: from the <Input> element's default attribute (if present)
+    - options: from the <Input> element's options attribute (if present)
+    """
+    functions = []
+    if os.path.exists(xml_file):
+        try:
+            tree = ET.parse(xml_file)
+            root = tree.getroot()
+            for f in root.findall("Function"):
+                fn_name = f.get("name", "").strip()
+                definition = f.findtext("Definition", "").strip()
+                description = f.findtext("Description", "").strip()
+                inputs = []
+                for input_elem in f.findall("./Inputs/Input"):
+                    inputs.append({
+                        "input_type": input_elem.get("type", "None").strip(),
+                        "default_value": input_elem.get("default", "").strip(),
+                        "options": input_elem.get("options", "").strip()
+                    })
+                functions.append({
+                    "name": fn_name,
+                    "definition": definition,
+                    "description": description,
+                    "inputs": inputs
+                })
+        except Exception as e:
+            print(f"Error loading XML: {e}")
+    return functions
+
+
+
+def appendFunctionDefinitions(xml_file, definitions):
+    """Append function definitions to a config file, in the layout the XML creator writes."""
+    if os.path.exists(xml_file) and os.path.getsize(xml_file) > 0:
+        root = ET.parse(xml_file).getroot()
+    else:
+        root = ET.Element("Functions")
+    for func_def in definitions:
+        function_elem = ET.SubElement(root, "Function", name=func_def["name"])
+        ET.SubElement(function_elem, "Definition").text = func_def["definition"]
+        inputs_elem = ET.SubElement(function_elem, "Inputs")
+        for input_def in func_def.get("inputs", []):
+            attribs = {"type": input_def["input_type"], "default": input_def["default_value"]}
+            if input_def.get("options"):
+                attribs["options"] = input_def["options"]
+            ET.SubElement(inputs_elem, "Input", **attribs)
+        ET.SubElement(function_elem, "Description").text = func_def.get("description", "")
+    ET.indent(root, space="  ", level=0)
+
+    temp_file = xml_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(ET.tostring(root, encoding="unicode"))
+    os.replace(temp_file, xml_file)
+
+
+
+def configCachePathFor(xml_file):
+    """Return the compiled cache path of a config file: functions_config.xml -> functions_config_cache.pickle."""
+    stem, _ = os.path.splitext(xml_file)
+    return stem + "_cache.pickle"
+
+
+
+def _readConfigCache(cache_file, xml_file, stamp):
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        return None  # Missing, truncated or written by an incompatible version
+    if (not isinstance(cached, dict) or cached.get("version") != CONFIG_CACHE_VERSION
+            or cached.get("source") != os.path.abspath(xml_file) or cached.get("stamp") != stamp):
+        return None
+    return cached["definitions"], cached["input_specs"]
+
+
+
+def _writeConfigCache(cache_file, xml_file, stamp, definitions, input_specs):
+    cached = {
+        "version": CONFIG_CACHE_VERSION,
+        "source": os.path.abspath(xml_file),
+        "stamp": stamp,
+        "definitions": definitions,
+        "input_specs": input_specs
+    }
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print(f"Could not write config cache {cache_file}: {e}")
+
+
+
+def loadFunctionConfig(xml_file, use_cache=True):
+    """Return (definitions, input_specs) for a config file, through the compiled cache.
+
+    The cache holds the normalised definitions and the parsed InputSpecs of
+    every function and is keyed by source path, file stamp and
+    CONFIG_CACHE_VERSION; on a miss the XML is parsed and the cache rebuilt.
+    """
+    start = time.perf_counter()
+    stamp = fileStamp(xml_file)
+    cache_file = configCachePathFor(xml_file)
+    if use_cache and stamp is not None:
+        cached = _readConfigCache(cache_file, xml_file, stamp)
+        if cached is not None:
+            if REPORT_CONFIG_TIMING:
+                print(f"Config cache hit for {xml_file}: {(time.perf_counter() - start) * 1000:.2f} ms")
+            return cached
+
+    definitions = loadFunctionDefinitionsFromXML(xml_file)
+    input_specs = buildInputSpecs(definitions)
+    if REPORT_CONFIG_TIMING:
+        print(f"Config parsed from {xml_file}: {(time.perf_counter() - start) * 1000:.2f} ms")
+    if use_cache and stamp is not None and fileStamp(xml_file) == stamp:
+        _writeConfigCache(cache_file, xml_file, stamp, definitions, input_specs)
+    return definitions, input_specs
+
+
+
+def parseInputSpec(input_def):
+    """Build an InputSpec from one of the input dicts of a function definition."""
+    options = tuple(o.strip() for o in input_def["options"].split(",") if o.strip())
+    default_value = input_def["default_value"]
+    default_index = options.index(default_value) if default_value in options else -1
+    return InputSpec(input_def["input_type"], default_value, options, default_index)
+
+
+
+def buildInputSpecs(function_definitions):
+    """Return {name: tuple of InputSpec} for every function; the first definition of a name wins."""
+    input_specs = {}
+    for func_def in function_definitions:
+        if func_def["name"] not in input_specs:
+            input_specs[func_def["name"]] = tuple(parseInputSpec(i) for i in func_def.get("inputs", []))
+    return input_specs
+
+
+
+class FunctionRegistry(object):
+    """Indexed view over the function definitions of functions_config.xml.
+
+    Lookups by friendly name, definition key and dropdown index are O(1), and
+    the input specs of every function are parsed once per config load.
+    """
+
+    def __init__(self, function_definitions, input_specs=None):
+        self.definitions = list(function_definitions)
+        self.names = [f["name"] for f in self.definitions]  # Dropdown order
+        self.descriptions = [f.get("description", "") for f in self.definitions]
+        self._by_name = {}
+        self._by_key = {}
+        self._input_specs = input_specs if input_specs is not None else buildInputSpecs(self.definitions)
+        for index, func_def in enumerate(self.definitions):
+            # First match wins, like the next(...) scans this replaces.
+            if func_def["name"] not in self._by_name:
+                self._by_name[func_def["name"]] = index
+            key = func_def["definition"].strip()
+            self._by_key[key] = self._by_key.get(key, ()) + (func_def,)
+
+    @classmethod
+    def fromXML(cls, xml_file, use_cache=True):
+        """Build the registry from a config file, through the compiled cache unless use_cache is False."""
+        return cls(*loadFunctionConfig(xml_file, use_cache))
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def __iter__(self):
+        return iter(self.definitions)
+
+    def byName(self, name):
+        """Return the definition for a friendly name, or None."""
+        index = self._by_name.get(name)
+        return None if index is None else self.definitions[index]
+
+    def byKey(self, key):
+        """Return every definition pointing at an ACTION_FUNCTIONS key (a tuple, possibly empty)."""
+        return self._by_key.get(key.strip(), ())
+
+    def byIndex(self, index):
+        """Return the definition shown at a dropdown index, or None."""
+        if 0 <= index < len(self.definitions):
+            return self.definitions[index]
+        return None
+
+    def indexOf(self, name):
+        """Return the dropdown index of a friendly name, or -1."""
+        return self._by_name.get(name, -1)
+
+    def inputSpecs(self, name):
+        """Return the parsed InputSpecs of a function (empty for unknown names)."""
+        return self._input_specs.get(name, ())
+
+
+
+def diffRegistries(old, new):
+    """Compare two FunctionRegistry objects by friendly name.
+
+    changed lists names whose definition key, description or inputs differ;
+    list_changed is True when the dropdown list (order or membership, and so
+    the indexes) differs.
+    """
+    old_names = set(old.names)
+    new_names = set(new.names)
+    changed = tuple(
+        name for name in new.names
+        if name in old_names and old.byName(name) != new.byName(name)
+    )
+    return RegistryDiff(
+        added=tuple(n for n in new.names if n not in old_names),
+        removed=tuple(n for n in old.names if n not in new_names),
+        changed=tuple(dict.fromkeys(changed)),
+        list_changed=old.names != new.names
+    )
@@ -0,0 +1,196 @@
+"""In-memory stand-in for the parts of pyfbsdk GUIGUI touches.
+
+Lets StackEngine, batchRunner and sceneState run outside MotionBuilder, for
+benchmarks and for action lists that only need a scene to exist. It is not
+a simulation of MotionBuilder; it only keeps enough state to answer the
+same calls.
+"""
+
+
+class FBTime(object):
+    FRAMES_PER_SECOND = 30
+
+    def __init__(self, hour=0, minute=0, second=0, frame=0):
+        self._frame = ((hour * 60 + minute) * 60 + second) * self.FRAMES_PER_SECOND + frame
+
+    def GetFrame(self):
+        return self._frame
+
+
+class FBComponent(object):
+    def __init__(self, name):
+        self.Name = name
+        self.LongName = name
+        self._selected = False
+
+    @property
+    def Selected(self):
+        return self._selected
+
+    @Selected.setter
+    def Selected(self, value):
+        value = bool(value)
+        if value != self._selected:
+            self._selected = value
+            (_scene.selection.add if value else _scene.selection.discard)(self)
+
+
+class FBModel(FBComponent):
+    pass
+
+
+class FBModelList(list):
+    pass
+
+
+class FBAnimationLayer(FBComponent):
+    pass
+
+
+class FBTake(FBComponent):
+    def __init__(self, name):
+        super(FBTake, self).__init__(name)
+        self._layers = [FBAnimationLayer("BaseAnimation")]
+        self._current_layer = 0
+
+    def GetLayerCount(self):
+        return len(self._layers)
+
+    def GetLayer(self, index):
+        return self._layers[index]
+
+    def CreateNewLayer(self):
+        self._layers.append(FBAnimationLayer(f"AnimLayer{len(self._layers)}"))
+
+    def GetCurrentLayer(self):
+        return self._current_layer
+
+    def SetCurrentLayer(self, index):
+        self._current_layer = index
+
+
+class FBScene(object):
+    def __init__(self):
+        self.Components = []
+        self.Takes = [FBTake("Take 001")]
+        self.selection = set()
+        self.evaluate_count = 0
+        self.change_depth = 0  # > 0 between FBBeginChangeAllModels/FBEndChangeAllModels
+        self.dirty = False
+
+    def Evaluate(self):
+        """Touch every component, so evaluation cost grows with the scene like the real one.
+
+        Between FBBeginChangeAllModels/FBEndChangeAllModels it only marks the
+        scene dirty. That models the deferral; it is not a measurement of what
+        the real SDK skips.
+        """
+        if self.change_depth:
+            self.dirty = True
+            return
+        self.evaluate_count += 1
+        for component in self.Components:
+            component.Selected
+
+
+class _SystemState(object):
+    def __init__(self):
+        self.current_take = None
+        self.frame = 0
+        self.scene_file = ""
+
+
+_scene = FBScene()
+_state = _SystemState()
+_state.current_take = _scene.Takes[0]
+
+
+class FBSystem(object):
+    @property
+    def Scene(self):
+        return _scene
+
+    @property
+    def CurrentTake(self):
+        return _state.current_take
+
+    @CurrentTake.setter
+    def CurrentTake(self, take):
+        _state.current_take = take
+
+    @property
+    def LocalTime(self):
+        return FBTime(0, 0, 0, _state.frame)
+
+
+class FBPlayerControl(object):
+    def Goto(self, time):
+        _state.frame = time.GetFrame()
+
+
+class FBApplication(object):
+    @property
+    def FBXFileName(self):
+        return _state.scene_file
+
+    def FileNew(self):
+        resetScene()
+        return True
+
+    def FileOpen(self, path, *args):
+        resetScene()
+        _state.scene_file = path
+        return True
+
+
+class FBUndoManager(object):
+    open_transactions = []
+    committed = []
+
+    def TransactionBegin(self, name):
+        FBUndoManager.open_transactions.append(name)
+        return True
+
+    def TransactionEnd(self):
+        FBUndoManager.committed.append(FBUndoManager.open_transactions.pop())
+        return True
+
+
+def FBBeginChangeAllModels():
+    _scene.change_depth += 1
+
+
+def FBEndChangeAllModels():
+    _scene.change_depth -= 1
+    if not _scene.change_depth and _scene.dirty:
+        _scene.dirty = False
+        _scene.Evaluate()
+
+
+def FBGetSelectedModels(model_list, *args):
+    model_list.extend(c for c in _scene.selection if isinstance(c, FBModel))
+
+
+def resetScene():
+    """Start over with an empty scene holding one take."""
+    global _scene
+    _scene = FBScene()
+    _state.current_take = _scene.Takes[0]
+    _state.frame = 0
+    _state.scene_file = ""
+
+
+def buildSyntheticScene(component_count, take_count=1, selected_every=0):
+    """Fill the scene with component_count models and take_count takes.
+
+    Every selected_every-th model starts selected (0 selects none).
+    """
+    resetScene()
+    _scene.Takes = [FBTake(f"Take {i + 1:03d}") for i in range(take_count)]
+    _state.current_take = _scene.Takes[0]
+    for i in range(component_count):
+        model = FBModel(f"Model_{i}")
+        _scene.Components.append(model)
+        if selected_every and i % selected_every == 0:
+            model.Selected = True
+    return _scene
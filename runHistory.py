@@ -0,0 +1,119 @@
+import json
+import math
+import os
+import time
+
+from stackEngine import STACKS_FILE
+
+
+MAX_HISTORY_BYTES = 2 * 1024 * 1024
+HISTORY_BACKUPS = 3
+
+
+
+def historyPathFor(stacks_file=STACKS_FILE):
+    """Return the run history file that lives next to a stacks file."""
+    return os.path.splitext(stacks_file)[0] + "_history.jsonl"
+
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+
+class RunHistory(object):
+    """Bounded on-disk history of per-action timings.
+
+    Records are JSON lines. When the file grows past max_bytes it is rotated
+    to .1, .2, ... like a RotatingFileHandler, keeping backup_count old files.
+    """
+
+    def __init__(self, path=None, max_bytes=MAX_HISTORY_BYTES, backup_count=HISTORY_BACKUPS):
+        self.path = path or historyPathFor()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def recordRun(self, result, scene="", take=""):
+        """Append the timings of one runPlan result, tagged with scene and take."""
+        if not result.get("timings"):
+            return
+        run_id = f"{time.time():.6f}"
+        lines = []
+        for timing in result["timings"]:
+            record = dict(timing)
+            record.update({
+                "run": run_id,
+                "stack": result.get("stack_name", ""),
+                "scene": scene,
+                "take": take
+            })
+            lines.append(json.dumps(record, separators=(",", ":")))
+        try:
+            self._rotateIfNeeded()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Error writing run history: {e}")
+
+    def _rotateIfNeeded(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def records(self):
+        """Yield every stored record, oldest first."""
+        paths = [f"{self.path}.{i}" for i in range(self.backup_count, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from an interrupted write
+
+    def actionStats(self, stack_name=None):
+        """Return {function key: {"count", "p50_ms", "p95_ms", "max_ms"}} across all runs."""
+        samples = {}
+        for record in self.records():
+            if stack_name and record.get("stack") != stack_name:
+                continue
+            samples.setdefault(record["key"], []).append(record["ns"])
+
+        stats = {}
+        for key, values in samples.items():
+            values.sort()
+            stats[key] = {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50) / 1e6,
+                "p95_ms": percentile(values, 0.95) / 1e6,
+                "max_ms": values[-1] / 1e6
+            }
+        return stats
+
+
+
+def formatStats(stats):
+    """Render actionStats as a plain-text table, slowest p95 first."""
+    lines = [f"{'Action':<30} {'Runs':>6} {'p50 ms':>10} {'p95 ms':>10} {'Max ms':>10}"]
+    for key, s in sorted(stats.items(), key=lambda item: -item[1]["p95_ms"]):
+        lines.append(f"{key:<30} {s['count']:>6} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['max_ms']:>10.2f}")
+    return "\n".join(lines)
+
+
+
+if __name__ == "__main__":
+    print(formatStats(RunHistory().actionStats()))
@@ -0,0 +1,189 @@
+import fnmatch
+import time
+from collections import namedtuple
+
+
+# What runAllActions puts back after a stack: current take, its active layer,
+# the frame and the full model selection (LongName -> model).
+SceneSnapshot = namedtuple("SceneSnapshot", ["take", "take_name", "layer", "frame", "selection"])
+
+
+
+def selectedModels(sdk):
+    """Return {LongName: model} for the current selection without scanning Scene.Components."""
+    models = sdk.FBModelList()
+    sdk.FBGetSelectedModels(models)
+    return {m.LongName: m for m in models}
+
+
+
+def captureSnapshot(sdk):
+    """Capture take, layer, frame and selection through selection-scoped queries."""
+    system = sdk.FBSystem()
+    take = system.CurrentTake
+    layer = take.GetCurrentLayer() if take else None
+    return SceneSnapshot(
+        take=take,
+        take_name=take.Name if take else None,
+        layer=layer,
+        frame=system.LocalTime.GetFrame(),
+        selection=selectedModels(sdk)
+    )
+
+
+
+def _restoreTake(system, snapshot):
+    try:
+        if system.CurrentTake == snapshot.take:
+            return False
+        system.CurrentTake = snapshot.take
+        return True
+    except Exception:
+        pass  # The take object is gone; fall back to a lookup by name below
+
+    for take in system.Scene.Takes:
+        if take.Name == snapshot.take_name:
+            system.CurrentTake = take
+            return True
+    print("Original take not found; it may have been renamed or deleted.")
+    return False
+
+
+
+def restoreSnapshot(sdk, snapshot):
+    """Put the scene back to a snapshot, touching only what actually changed.
+
+    Returns the number of properties that had to be written.
+    """
+    system = sdk.FBSystem()
+    changes = 0
+
+    if snapshot.take is not None and _restoreTake(system, snapshot):
+        changes += 1
+
+    take = system.CurrentTake
+    if take is not None and snapshot.layer is not None:
+        try:
+            if take.GetCurrentLayer() != snapshot.layer:
+                take.SetCurrentLayer(snapshot.layer)
+                changes += 1
+        except Exception as e:
+            print("Error restoring active layer:", e)
+
+    try:
+        if system.LocalTime.GetFrame() != snapshot.frame:
+            sdk.FBPlayerControl().Goto(sdk.FBTime(0, 0, 0, snapshot.frame))
+            changes += 1
+    except Exception as e:
+        print("Error restoring current frame:", e)
+
+    current = selectedModels(sdk)
+    for name, model in current.items():
+        if name not in snapshot.selection:
+            model.Selected = False
+            changes += 1
+    for name, model in snapshot.selection.items():
+        if name not in current:
+            try:
+                model.Selected = True
+                changes += 1
+            except Exception:
+                pass  # Model was deleted by the stack
+    return changes
+
+
+
+def matchTakes(sdk, names=None, pattern=None):
+    """Return the scene's takes filtered by exact names and/or an fnmatch pattern, in scene order."""
+    wanted = set(names) if names else None
+    takes = []
+    for take in sdk.FBSystem().Scene.Takes:
+        if wanted is not None and take.Name not in wanted:
+            continue
+        if pattern and not fnmatch.fnmatchcase(take.Name, pattern):
+            continue
+        takes.append(take)
+    return takes
+
+
+
+def runOnTakes(sdk, takes, run):
+    """Make each take current in turn and call run() on it.
+
+    The user's take, layer, frame and selection are captured once before the
+    first take and restored once after the last one. Returns the list of
+    run() results with a "take" key added to each.
+    """
+    system = sdk.FBSystem()
+    snapshot = captureSnapshot(sdk)
+    results = []
+    try:
+        for take in list(takes):  # The stack may add takes while we iterate
+            take_name = take.Name
+            try:
+                system.CurrentTake = take
+            except Exception as e:
+                results.append({"take": take_name, "success": False, "warnings": [],
+                                "log_messages": [], "error": f"Could not switch to take: {e}",
+                                "error_row": None, "timings": []})
+                continue
+            result = run()
+            result["take"] = take_name
+            results.append(result)
+    finally:
+        restoreSnapshot(sdk, snapshot)
+    return results
+
+
+
+def _legacyCapture(sdk):
+    """The old save_current_state bookkeeping, kept only for the benchmark."""
+    system = sdk.FBSystem()
+    take = system.CurrentTake
+    take_index = next((i for i, t in enumerate(system.Scene.Takes) if t == take), -1)
+    selected = next((c.LongName for c in system.Scene.Components if isinstance(c, sdk.FBModel) and c.Selected), None)
+    return {"take_name": take.Name, "take_index": take_index, "selected_effector": selected,
+            "active_layer": take.GetCurrentLayer(), "current_frame": system.LocalTime.GetFrame()}
+
+
+
+def _legacyRestore(sdk, state):
+    """The old restore_saved_state bookkeeping, kept only for the benchmark."""
+    system = sdk.FBSystem()
+    for t in system.Scene.Takes:
+        if t.Name == state["take_name"]:
+            system.CurrentTake = t
+            break
+    system.CurrentTake.SetCurrentLayer(state["active_layer"])
+    sdk.FBPlayerControl().Goto(sdk.FBTime(0, 0, 0, state["current_frame"]))
+    for comp in system.Scene.Components:
+        if hasattr(comp, "LongName"):
+            comp.Selected = (comp.LongName == state["selected_effector"])
+
+
+
+def benchmarkSnapshots(component_counts=(1000, 10000, 50000), repeats=20):
+    """Compare legacy full-scan bookkeeping with snapshots on synthetic scenes."""
+    import pyfbsdkStandIn as sdk
+
+    for count in component_counts:
+        sdk.buildSyntheticScene(count, take_count=200, selected_every=max(1, count // 5))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _legacyRestore(sdk, _legacyCapture(sdk))
+        legacy = (time.perf_counter() - start) / repeats
+
+        sdk.buildSyntheticScene(count, take_count=200, selected_every=max(1, count // 5))
+        start = time.perf_counter()
+        for _ in range(repeats):
+            restoreSnapshot(sdk, captureSnapshot(sdk))
+        snapshot = (time.perf_counter() - start) / repeats
+
+        print(f"{count:>7} components: legacy {legacy * 1000:8.3f} ms, snapshot {snapshot * 1000:8.3f} ms "
+              f"({legacy / snapshot:6.1f}x)")
+
+
+
+if __name__ == "__main__":
+    benchmarkSnapshots()
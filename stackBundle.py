@@ -0,0 +1,264 @@
+import argparse
+import gzip
+import json
+import os
+import time
+
+from functionRegistry import FunctionRegistry, appendFunctionDefinitions
+from stackEngine import CONFIG_FILE, STACKS_FILE
+from stackStore import NEW_STACK, StackConflictError, openStackStore, stackVersion
+
+
+BUNDLE_FORMAT = "guigui-stack-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_EXTENSION = ".stacks.gz"
+CONFLICT_POLICIES = ("rename", "replace", "skip")
+
+
+
+def exportBundle(store, bundle_file, function_registry=None, names=None):
+    """Write stacks to a gzipped JSON lines bundle. Returns how many were written.
+
+    names selects stacks (default: the whole library). The first line is a
+    header, then one line per function definition the stacks use (taken from
+    function_registry, if given), then one line per stack with its actions
+    as compact [name, index, value] triples.
+    """
+    if names is None:
+        stacks = store.allStacks()
+    else:
+        stacks = [(name, store.getStack(name)) for name in names]
+        stacks = [(name, actions) for name, actions in stacks if actions is not None]
+
+    functions = {}
+    if function_registry is not None:
+        for _, actions in stacks:
+            for action in actions:
+                if action["name"] not in functions:
+                    func_def = function_registry.byName(action["name"])
+                    if func_def is not None:
+                        functions[action["name"]] = func_def
+
+    with gzip.open(bundle_file, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(json.dumps({"type": "bundle", "format": BUNDLE_FORMAT, "version": BUNDLE_VERSION,
+                            "stacks": len(stacks), "functions": len(functions)}) + "\n")
+        for func_def in functions.values():
+            f.write(json.dumps({"type": "function", "definition": func_def}, separators=(",", ":")) + "\n")
+        for name, actions in stacks:
+            triples = [[a["name"], str(a.get("index", "") or ""), a.get("value", "") or ""] for a in actions]
+            f.write(json.dumps({"type": "stack", "name": name, "actions": triples}, separators=(",", ":")) + "\n")
+    return len(stacks)
+
+
+
+def _isTriple(action):
+    return isinstance(action, list) and len(action) == 3 and all(isinstance(field, str) for field in action)
+
+
+
+def _isFunctionDefinition(definition):
+    """True if definition has the shape loadFunctionDefinitionsFromXML returns and appendFunctionDefinitions writes."""
+    if not isinstance(definition, dict):
+        return False
+    if not all(isinstance(definition.get(key), str) for key in ("name", "definition", "description")):
+        return False
+    inputs = definition.get("inputs")
+    return isinstance(inputs, list) and all(
+        isinstance(i, dict) and all(isinstance(i.get(key), str) for key in ("input_type", "default_value", "options"))
+        for i in inputs
+    )
+
+
+
+def readBundle(bundle_file):
+    """Return (function definitions, [(name, actions)]) from a bundle.
+
+    Raises ValueError if it is not one or if any record is malformed, so
+    nothing of a damaged bundle gets imported. Records of unknown types
+    are skipped, for bundles from newer versions.
+    """
+    functions = []
+    stacks = []
+    with gzip.open(bundle_file, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if not isinstance(header, dict) or header.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{bundle_file} is not a stack bundle")
+        version = header.get("version", 0)
+        if not isinstance(version, int) or isinstance(version, bool):
+            raise ValueError(f"{bundle_file} has a malformed header (version {version!r})")
+        if version > BUNDLE_VERSION:
+            raise ValueError(f"{bundle_file} was written by a newer version (bundle version {header['version']})")
+        for line_number, line in enumerate(f, 2):
+            record = json.loads(line)
+            if not isinstance(record, dict) or "type" not in record:
+                raise ValueError(f"{bundle_file}, line {line_number}: record has no type")
+            if record["type"] == "stack":
+                name, actions = record.get("name"), record.get("actions")
+                if not isinstance(name, str) or not name or not isinstance(actions, list) \
+                        or not all(_isTriple(a) for a in actions):
+                    raise ValueError(f"{bundle_file}, line {line_number}: malformed stack record")
+                stacks.append((name, [{"name": n, "index": i, "value": v} for n, i, v in actions]))
+            elif record["type"] == "function":
+                definition = record.get("definition")
+                if not _isFunctionDefinition(definition):
+                    raise ValueError(f"{bundle_file}, line {line_number}: malformed function record")
+                functions.append(definition)
+    return functions, stacks
+
+
+
+def _freeName(name, taken):
+    candidate = f"{name} (imported)"
+    number = 2
+    while candidate in taken:
+        candidate = f"{name} (imported {number})"
+        number += 1
+    return candidate
+
+
+
+def importBundle(store, bundle_file, function_registry=None, on_conflict="rename"):
+    """Import a bundle into a store in one transaction, deduplicated by content.
+
+    Stacks identical to the one stored under the same name are left out.
+    A stack whose name is taken by different content replaces the stored
+    one with on_conflict "replace"; otherwise it is skipped ("skip") or
+    would be added under a new name ("rename"). Any stack that would be
+    added under a new name, its own or a renamed one, is left out if the
+    same content is already in the library or earlier in the bundle; it is
+    listed in duplicates with the name that content is stored under, and
+    not created.
+
+    Decisions are made against one read of the library and the write
+    expects every written name to still be as read, so a stack another
+    session creates or changes in between is never overwritten: the
+    import raises StackConflictError and writes nothing.
+    Returns a report dict; missing_functions lists the embedded
+    definitions that function_registry does not know.
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+    functions, stacks = readBundle(bundle_file)
+
+    report = {"stacks": len(stacks), "imported": 0, "unchanged": 0, "renamed": [], "skipped": [],
+              "duplicates": [], "missing_functions": []}
+    stored_versions = {n: stackVersion(a) for n, a in store.allStacks()}
+    taken = set(stored_versions)
+    incoming = {}  # name -> actions; later stacks of the same name win, as in saveStack
+    for name, actions in stacks:
+        incoming[name] = actions
+
+    reserved = taken | set(incoming)
+    library_versions = {}  # version -> first name it is stored under, bundle stacks included as resolved
+    for stored_name, version in stored_versions.items():
+        library_versions.setdefault(version, stored_name)
+    resolved = []
+    for name, actions in incoming.items():
+        version = stackVersion(actions)
+        if stored_versions.get(name) == version:
+            report["unchanged"] += 1
+            continue
+        if name in taken and on_conflict == "skip":
+            report["skipped"].append(name)
+            continue
+        if not (name in taken and on_conflict == "replace"):
+            # Added under a new name: only if that content is not stored yet.
+            if version in library_versions:
+                report["duplicates"].append((name, library_versions[version]))
+                continue
+            if name in taken:
+                new_name = _freeName(name, reserved)
+                reserved.add(new_name)
+                report["renamed"].append((name, new_name))
+                name = new_name
+        library_versions.setdefault(version, name)
+        resolved.append((name, actions))
+
+    written = store.upsertStacks(resolved, {name: stored_versions.get(name, NEW_STACK) for name, _ in resolved})
+    report["imported"] = len(written)
+    report["unchanged"] += len(resolved) - len(written)
+
+    if function_registry is not None:
+        report["missing_functions"] = [f for f in functions if function_registry.byName(f["name"]) is None]
+    return report
+
+
+
+def formatImportReport(report):
+    lines = [f"{report['imported']} of {report['stacks']} stack(s) imported, {report['unchanged']} unchanged"
+             + (f", {len(report['duplicates'])} not created" if report["duplicates"] else "")]
+    for old_name, new_name in report["renamed"]:
+        lines.append(f"Renamed '{old_name}' to '{new_name}' (a different stack already has that name)")
+    if report["duplicates"]:
+        for name, existing in report["duplicates"]:
+            lines.append(f"Not created '{name}': the same stack is already in the library as '{existing}'")
+    if report["skipped"]:
+        lines.append(f"Skipped (name taken): {', '.join(report['skipped'])}")
+    if report["missing_functions"]:
+        lines.append(f"Functions not in this config: {', '.join(f['name'] for f in report['missing_functions'])}")
+    return "\n".join(lines)
+
+
+
+def benchmarkBundles(stack_count=10000, actions_per_stack=10):
+    """Time exporting and importing a generated library with every store backend."""
+    import tempfile
+
+    folder = tempfile.mkdtemp()
+    stacks = [(f"Stack {i}", [{"name": f"Function {j}", "index": str(j), "value": f"value {i};{j}"}
+                              for j in range(actions_per_stack)])
+              for i in range(stack_count)]
+    source = openStackStore(os.path.join(folder, "source.db"))
+    source.upsertStacks(stacks)
+
+    bundle_file = os.path.join(folder, "library" + BUNDLE_EXTENSION)
+    start = time.perf_counter()
+    exportBundle(source, bundle_file)
+    print(f"export {stack_count} stacks: {time.perf_counter() - start:6.2f}s, "
+          f"{os.path.getsize(bundle_file) / 1024:.0f} KB")
+
+    for file_name in ("saved_stacks.xml", "saved_stacks.journal", "saved_stacks.db"):
+        store = openStackStore(os.path.join(folder, file_name))
+        start = time.perf_counter()
+        first = importBundle(store, bundle_file)
+        first_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        again = importBundle(store, bundle_file)
+        again_seconds = time.perf_counter() - start
+        print(f"{file_name:<22} import {first['imported']} in {first_seconds:6.2f}s, "
+              f"re-import ({again['unchanged']} unchanged) in {again_seconds:6.2f}s")
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import GUIGUI stack bundles.")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--stacks", default=STACKS_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write stacks to a bundle")
+    export_parser.add_argument("bundle")
+    export_parser.add_argument("names", nargs="*", help="Stacks to export (default: all)")
+    import_parser = commands.add_parser("import", help="Import a bundle into the library")
+    import_parser.add_argument("bundle")
+    import_parser.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default="rename")
+    import_parser.add_argument("--add-functions", action="store_true",
+                               help="Append embedded function definitions missing from the config")
+    commands.add_parser("benchmark", help="Time a generated 10k-stack bundle")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        benchmarkBundles()
+    elif args.command == "export":
+        count = exportBundle(openStackStore(args.stacks), args.bundle, FunctionRegistry.fromXML(args.config),
+                             args.names or None)
+        print(f"Exported {count} stack(s) to {args.bundle}")
+    else:
+        try:
+            result = importBundle(openStackStore(args.stacks, history=True), args.bundle,
+                                  FunctionRegistry.fromXML(args.config), args.on_conflict)
+        except StackConflictError as e:
+            parser.exit(1, f"Nothing imported: {e}. Run the import again.\n")
+        print(formatImportReport(result))
+        if args.add_functions and result["missing_functions"]:
+            appendFunctionDefinitions(args.config, result["missing_functions"])
+            print(f"Added {len(result['missing_functions'])} function definition(s) to {args.config}")
@@ -0,0 +1,129 @@
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+
+# An immutable parsed stack. actions is a tuple of read-only mappings with the
+# same "name", "index" and "value" keys as the action dicts used everywhere else.
+StackRecord = namedtuple("StackRecord", ["name", "actions"])
+
+# path -> (file stamp, tuple of StackRecord, {name: StackRecord})
+_entries = {}
+# path -> (file stamp, tuple of StackIndexEntry, {name: StackIndexEntry})
+_indexes = {}
+_lock = threading.Lock()
+
+
+
+def fileStamp(path):
+    """Return (mtime_ns, size, inode) for a file, or None when it does not exist.
+
+    The inode catches a file replaced by another process within the same
+    mtime tick and at the same size, which our atomic writes make likely.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+
+def freezeAction(action):
+    return MappingProxyType({
+        "name": action["name"],
+        "index": str(action.get("index", "") or ""),
+        "value": action.get("value", "") or ""
+    })
+
+
+
+def freezeStacks(stacks):
+    """Turn (name, actions) pairs into a tuple of StackRecords."""
+    return tuple(StackRecord(name, tuple(freezeAction(a) for a in actions)) for name, actions in stacks)
+
+
+
+def getStacks(path, loader):
+    """Return every stack of the file at path as a tuple of StackRecords.
+
+    loader(path) is only called when the file's stamp differs
+    from the cached one; otherwise the same immutable tuple is handed out
+    again, to every caller in the process.
+    """
+    key = os.path.abspath(path)
+    stamp = fileStamp(path)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+    records = freezeStacks(loader(path)) if stamp is not None else ()
+    _store(key, stamp, records)
+    return records
+
+
+
+def currentStacks(path):
+    """Return ({name: StackRecord}, records) if the fully parsed file is cached and current, else None."""
+    stamp = fileStamp(path)
+    with _lock:
+        entry = _entries.get(os.path.abspath(path))
+    if entry is None or entry[0] != stamp:
+        return None
+    return entry[2], entry[1]
+
+
+
+def getIndex(path, scanner):
+    """Return ({name: StackIndexEntry}, entries) for the file at path.
+
+    scanner(path) yields StackIndexEntry objects and is only run when the
+    file's stamp differs from the cached index.
+    """
+    key = os.path.abspath(path)
+    stamp = fileStamp(path)
+    with _lock:
+        entry = _indexes.get(key)
+    if entry is None or entry[0] != stamp:
+        entries = tuple(scanner(path)) if stamp is not None else ()
+        by_name = {}
+        for index_entry in entries:
+            by_name.setdefault(index_entry.name, index_entry)
+        entry = (stamp, entries, by_name)
+        with _lock:
+            _indexes[key] = entry
+    return entry[2], entry[1]
+
+
+
+def updateStacks(path, stamp, stacks):
+    """Record what we just wrote ourselves, so the next read does not re-parse it.
+
+    stamp must be the fileStamp of the file as written.
+    """
+    records = freezeStacks(stacks)
+    _store(os.path.abspath(path), stamp, records)
+    return records
+
+
+
+def invalidate(path=None):
+    """Forget one file, or everything when path is None."""
+    with _lock:
+        if path is None:
+            _entries.clear()
+            _indexes.clear()
+        else:
+            _entries.pop(os.path.abspath(path), None)
+            _indexes.pop(os.path.abspath(path), None)
+
+
+
+def _store(key, stamp, records):
+    by_name = {}
+    for record in records:
+        by_name.setdefault(record.name, record)  # First stack of a name wins, like the old lookups
+    with _lock:
+        _entries[key] = (stamp, records, by_name)
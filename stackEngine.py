@@ -0,0 +1,169 @@
+import os
+
+from functionRegistry import FunctionRegistry
+from sceneState import matchTakes, runOnTakes
+from stackCache import fileStamp
+from stackPlan import compileStack, runPlan
+from stackStore import openStackStore
+from stackTransaction import stackTransaction
+from stackValidation import validateStack
+
+
+# Default locations used by GUIGUI and the XML creator.
+DOCUMENTS_DIR = os.path.expanduser("~/Documents")
+CONFIG_FILE = os.path.join(DOCUMENTS_DIR, "functions_config.xml")
+# Point GUIGUI_STACKS_FILE at a .db file to keep the stack library in SQLite,
+# or at a .journal file for the append-only journal.
+STACKS_FILE = os.environ.get("GUIGUI_STACKS_FILE") or os.path.join(DOCUMENTS_DIR, "saved_stacks.xml")
+
+
+
+def sceneContext(sdk):
+    """Return (scene file, current take name) from the SDK, or empty strings."""
+    try:
+        scene = sdk.FBApplication().FBXFileName or ""
+    except Exception:
+        scene = ""
+    try:
+        take = sdk.FBSystem().CurrentTake
+        take_name = take.Name if take else ""
+    except Exception:
+        take_name = ""
+    return scene, take_name
+
+
+
+class StackEngine(object):
+    """Runs saved stacks straight from the stack library, without building any Qt widgets.
+
+    action_functions defaults to actionsList.ACTION_FUNCTIONS and sdk to
+    pyfbsdk; pass a dict of callables and a stand-in module to run outside
+    MotionBuilder. When a RunHistory is given, every run's timings are
+    recorded to it.
+    """
+
+    def __init__(self, config_file=CONFIG_FILE, stacks_file=STACKS_FILE, action_functions=None, sdk=None, history=None):
+        self.config_file = config_file
+        self.stacks_file = stacks_file
+        self.stack_store = openStackStore(stacks_file)
+        self._action_functions = action_functions
+        self._sdk = sdk
+        self.history = history
+        self._config_stamp = fileStamp(config_file)
+        self.function_registry = FunctionRegistry.fromXML(config_file)
+        self._plans = {}  # stack name -> (stacks file stamp, StackPlan)
+
+    @property
+    def action_functions(self):
+        if self._action_functions is None:
+            import actionsList  # Imported lazily, it pulls in pyfbsdk
+            self._action_functions = actionsList.ACTION_FUNCTIONS
+        return self._action_functions
+
+    @property
+    def sdk(self):
+        if self._sdk is None:
+            import pyfbsdk
+            self._sdk = pyfbsdk
+        return self._sdk
+
+    def refreshConfig(self):
+        """Reload functions_config.xml if it changed. Drops every cached plan."""
+        stamp = fileStamp(self.config_file)
+        if stamp != self._config_stamp:
+            self._config_stamp = stamp
+            self.function_registry = FunctionRegistry.fromXML(self.config_file)
+            self._plans.clear()
+
+    def loadStack(self, stack_name):
+        return self.stack_store.getStack(stack_name)
+
+    def compileActions(self, actions):
+        return compileStack(actions, self.function_registry, self.action_functions)
+
+    def getPlan(self, stack_name):
+        """Return the compiled plan for a saved stack, or None if it does not exist.
+
+        Plans are cached per stack and recompiled only when functions_config.xml
+        or the stacks file changes on disk.
+        """
+        self.refreshConfig()
+        stamp = fileStamp(self.stacks_file)
+        cached = self._plans.get(stack_name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        actions = self.loadStack(stack_name)
+        if actions is None:
+            self._plans.pop(stack_name, None)
+            return None
+        plan = self.compileActions(actions)
+        self._plans[stack_name] = (stamp, plan)
+        return plan
+
+    def validateStack(self, stack_name):
+        """Dry-run check of a saved stack; returns the problem list of stackValidation.validateStack."""
+        self.refreshConfig()
+        actions = self.loadStack(stack_name)
+        if actions is None:
+            return [{"row": None, "name": stack_name,
+                     "message": f"Stack '{stack_name}' not found in {self.stacks_file}"}]
+        return validateStack(actions, self.function_registry, self.action_functions)
+
+    def runStack(self, stack_name, transactional=False):
+        """Run a saved stack by name. Returns the result dict of runPlan."""
+        plan = self.getPlan(stack_name)
+        if plan is None:
+            return {
+                "stack_name": stack_name,
+                "success": False,
+                "warnings": [],
+                "log_messages": [],
+                "error": f"Stack '{stack_name}' not found in {self.stacks_file}",
+                "error_row": None,
+                "timings": []
+            }
+        return self.runCompiled(plan, stack_name, transactional)
+
+    def runStackOnTakes(self, stack_name, take_names=None, pattern=None, transactional=False):
+        """Run one saved stack on many takes in a single call.
+
+        Takes are picked by exact name and/or fnmatch pattern (all takes when
+        both are empty). The stack is compiled once, and the user's context
+        is captured and restored once around the whole batch.
+        """
+        report = {"stack_name": stack_name, "takes": [], "succeeded": 0, "failed": 0, "error": None}
+        plan = self.getPlan(stack_name)
+        if plan is None:
+            report["error"] = f"Stack '{stack_name}' not found in {self.stacks_file}"
+            return report
+
+        takes = matchTakes(self.sdk, take_names, pattern)
+        report["takes"] = runOnTakes(self.sdk, takes, lambda: self.runCompiled(plan, stack_name, transactional))
+        report["succeeded"] = sum(1 for r in report["takes"] if r["success"])
+        report["failed"] = len(report["takes"]) - report["succeeded"]
+        return report
+
+    def runActions(self, actions, stack_name=""):
+        """Compile and run a list of action dicts the same way GUIGUI.runAllActions does.
+
+        Unknown names and keys are collected as warnings and skipped; the first
+        exception stops the run and is reported with the row that raised it.
+        """
+        self.refreshConfig()
+        return self.runCompiled(self.compileActions(actions), stack_name)
+
+    def runCompiled(self, plan, stack_name="", transactional=False):
+        """Run a compiled plan and record its timings to the run history, if any.
+
+        With transactional=True the whole plan runs inside stackTransaction:
+        one undo step and a single evaluation flush at the end.
+        """
+        if transactional:
+            with stackTransaction(self.sdk, f"GUIGUI: {stack_name}"):
+                result = runPlan(plan, stack_name)
+        else:
+            result = runPlan(plan, stack_name)
+        if self.history is not None:
+            self.history.recordRun(result, *sceneContext(self.sdk))
+        return result
@@ -0,0 +1,212 @@
+import contextlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from stackStore import stackVersion
+
+
+# One saved state of a stack. version is the stackVersion of its actions (None
+# for a deletion); saved_at is a time.time() stamp, or None for the content a
+# stack already had when its history started.
+StackRevision = namedtuple("StackRevision", ["version", "saved_at"])
+
+REVISION_HISTORY_SUFFIX = ".history"
+
+
+
+def revisionHistoryPathFor(path):
+    """Return the revision history file of a stack library: saved_stacks.xml -> saved_stacks.xml.history (SQLite).
+
+    Not to be confused with runHistory.historyPathFor, the run timings log.
+    """
+    return path + REVISION_HISTORY_SUFFIX
+
+
+
+class StackHistory(object):
+    """Content-addressed revision history of a stack library, kept next to it in SQLite.
+
+    Each distinct action is stored once, each distinct action sequence once
+    (as a list of action ids, keyed by its stackVersion) and each save adds
+    one small revision row pointing at a sequence. Re-saving, duplicating or
+    rolling back to content seen before stores nothing but that row, and
+    near-identical variants only add the actions that differ.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            idx TEXT NOT NULL,
+            value TEXT NOT NULL,
+            UNIQUE (name, idx, value)
+        );
+        CREATE TABLE IF NOT EXISTS sequences (
+            version TEXT PRIMARY KEY,
+            action_ids TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS revisions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            version TEXT REFERENCES sequences(version),
+            saved_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS revisions_by_name ON revisions (name, id);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript(self.SCHEMA)
+        self._action_ids = {}  # (name, idx, value) -> id of committed rows; they are never deleted
+        self._new_action_ids = {}  # Ids inserted by the open transaction, cached once it commits
+
+    def close(self):
+        self.connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Run a write transaction; a rollback also forgets the action ids it inserted."""
+        self._new_action_ids = {}
+        try:
+            with self.connection:
+                yield
+            self._action_ids.update(self._new_action_ids)
+        finally:
+            self._new_action_ids = {}
+
+    def _actionId(self, key):
+        action_id = self._action_ids.get(key) or self._new_action_ids.get(key)
+        if action_id is None:
+            self.connection.execute("INSERT OR IGNORE INTO actions (name, idx, value) VALUES (?, ?, ?)", key)
+            action_id = self.connection.execute(
+                "SELECT id FROM actions WHERE name = ? AND idx = ? AND value = ?", key
+            ).fetchone()[0]
+            self._new_action_ids[key] = action_id
+        return action_id
+
+    def _storeSequence(self, actions):
+        version = stackVersion(actions)
+        if self.connection.execute("SELECT 1 FROM sequences WHERE version = ?", (version,)).fetchone() is None:
+            action_ids = [self._actionId((a["name"], str(a.get("index", "") or ""), a.get("value", "") or ""))
+                          for a in actions]
+            self.connection.execute("INSERT OR IGNORE INTO sequences (version, action_ids) VALUES (?, ?)",
+                                    (version, ",".join(map(str, action_ids))))
+        return version
+
+    def _latest(self, name):
+        """Return (version, found) for the newest revision of name."""
+        row = self.connection.execute(
+            "SELECT version FROM revisions WHERE name = ? ORDER BY id DESC LIMIT 1", (name,)
+        ).fetchone()
+        return (row[0], True) if row else (None, False)
+
+    def record(self, stacks, previous=None):
+        """Add a revision for every (name, actions) whose content differs from its newest one.
+
+        previous maps names to the actions they had before this save; for a
+        name without history yet, that content is recorded first, so the very
+        first overwrite can still be rolled back. Returns the names recorded.
+        """
+        previous = previous or {}
+        recorded = []
+        now = time.time()
+        with self._transaction():
+            for name, actions in stacks:
+                latest, found = self._latest(name)
+                if not found and previous.get(name) is not None:
+                    latest = self._storeSequence(previous[name])
+                    self.connection.execute("INSERT INTO revisions (name, version, saved_at) VALUES (?, ?, NULL)",
+                                            (name, latest))
+                version = self._storeSequence(actions)
+                if version != latest:
+                    self.connection.execute("INSERT INTO revisions (name, version, saved_at) VALUES (?, ?, ?)",
+                                            (name, version, now))
+                    recorded.append(name)
+        return recorded
+
+    def recordDelete(self, name, actions=None):
+        """Mark a stack as deleted; actions is what it held, kept if it had no history yet."""
+        if actions is not None:
+            self.record([(name, actions)])
+        with self._transaction():
+            if self._latest(name)[0] is not None:
+                self.connection.execute("INSERT INTO revisions (name, version, saved_at) VALUES (?, NULL, ?)",
+                                        (name, time.time()))
+
+    def recordRename(self, name, new_name):
+        """Move a stack's history to its new name."""
+        with self.connection:
+            self.connection.execute("UPDATE revisions SET name = ? WHERE name = ?", (new_name, name))
+
+    def names(self):
+        """Return every name with history, deleted stacks included, in order of first save."""
+        return [row[0] for row in self.connection.execute(
+            "SELECT name FROM revisions GROUP BY name ORDER BY MIN(id)"
+        )]
+
+    def revisions(self, name):
+        """Return the StackRevisions of a stack, newest first."""
+        return [StackRevision(version, saved_at) for version, saved_at in self.connection.execute(
+            "SELECT version, saved_at FROM revisions WHERE name = ? ORDER BY id DESC", (name,)
+        )]
+
+    def getRevision(self, version):
+        """Return the actions stored under a version, or None if it is unknown."""
+        row = self.connection.execute("SELECT action_ids FROM sequences WHERE version = ?", (version,)).fetchone()
+        if row is None:
+            return None
+        action_ids = [int(i) for i in row[0].split(",")] if row[0] else []
+        placeholders = ",".join("?" * len(set(action_ids)))
+        by_id = {action_id: {"name": n, "index": i, "value": v} for action_id, n, i, v in self.connection.execute(
+            f"SELECT id, name, idx, value FROM actions WHERE id IN ({placeholders})", sorted(set(action_ids))
+        )}
+        return [dict(by_id[action_id]) for action_id in action_ids]
+
+    def stats(self):
+        """Return how many revisions, distinct sequences and distinct actions are stored."""
+        return {table: self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("revisions", "sequences", "actions")}
+
+
+
+def benchmarkHistory(stack_count=50, saves_per_stack=40, actions_per_stack=20):
+    """Save many near-identical variants per stack, as artists do, and compare sizes and rollback time."""
+    import tempfile
+    from stackStore import openStackStore
+
+    folder = tempfile.mkdtemp()
+    library = os.path.join(folder, "saved_stacks.db")
+    store = openStackStore(library, history=True)
+
+    start = time.perf_counter()
+    for save in range(saves_per_stack):
+        for i in range(stack_count):
+            # Each save tweaks one value and sometimes goes back to an earlier variant.
+            variant = save % 10
+            store.upsertStack(f"Shot {i}", [
+                {"name": f"Function {j}", "index": str(j), "value": f"take_{i};{variant if j == save % actions_per_stack else 0}"}
+                for j in range(actions_per_stack)
+            ])
+    elapsed = time.perf_counter() - start
+    saves = stack_count * saves_per_stack
+    print(f"{saves} saves in {elapsed:.2f}s ({elapsed / saves * 1000:.2f} ms each, history included)")
+
+    stats = store.history.stats()
+    full_copies = stats["revisions"] * actions_per_stack
+    print(f"{stats['revisions']} revisions, {stats['sequences']} distinct sequences, {stats['actions']} distinct actions "
+          f"(full copies would be {full_copies} actions)")
+    print(f"library {os.path.getsize(library) / 1024:.0f} KB, "
+          f"history {os.path.getsize(revisionHistoryPathFor(library)) / 1024:.0f} KB")
+
+    revisions = store.stackHistory("Shot 0")
+    start = time.perf_counter()
+    store.rollbackStack("Shot 0", revisions[-1].version)
+    print(f"Rollback to the oldest of {len(revisions)} revisions: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+
+if __name__ == "__main__":
+    benchmarkHistory()
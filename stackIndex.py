@@ -0,0 +1,137 @@
+import os
+import time
+from collections import namedtuple
+from xml.parsers import expat
+
+
+# One <Stack> of a saved_stacks.xml file: its name, how many actions it has and
+# the byte offset of its opening tag, so loadStackAt can read just that stack.
+StackIndexEntry = namedtuple("StackIndexEntry", ["name", "action_count", "offset"])
+
+CHUNK_SIZE = 64 * 1024
+
+
+
+class _StackEnd(Exception):
+    pass
+
+
+
+def scanStackIndex(xml_file, chunk_size=CHUNK_SIZE):
+    """Yield a StackIndexEntry per stack, streaming the file in chunks.
+
+    Uses expat directly rather than iterparse: no element objects are built
+    at all, memory stays flat whatever the file size, and expat reports the
+    byte offset of every start tag. Raises expat.ExpatError on a broken file.
+    """
+    pending = []
+    current = {}
+
+    parser = expat.ParserCreate()
+
+    def start(tag, attrs):
+        if tag == "Stack":
+            current["name"] = attrs.get("name")
+            current["count"] = 0
+            current["offset"] = parser.CurrentByteIndex
+        elif tag == "Action" and current:
+            current["count"] += 1
+
+    def end(tag):
+        if tag == "Stack" and current:
+            if current["name"]:
+                pending.append(StackIndexEntry(current["name"], current["count"], current["offset"]))
+            current.clear()
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+
+    with open(xml_file, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            parser.Parse(chunk, not chunk)
+            if pending:
+                yield from pending
+                pending.clear()
+            if not chunk:
+                break
+
+
+
+def loadStackAt(xml_file, offset, chunk_size=CHUNK_SIZE):
+    """Read the actions of the single stack whose <Stack> tag starts at offset.
+
+    Returns action dicts in the same shape as readStacksXML.
+    """
+    actions = []
+
+    def start(tag, attrs):
+        if tag == "Action":
+            actions.append({
+                "name": attrs.get("name", "").strip(),
+                "index": attrs.get("index", ""),
+                "value": attrs.get("value", "")
+            })
+
+    def end(tag):
+        if tag == "Stack":
+            raise _StackEnd()
+
+    parser = expat.ParserCreate("utf-8")
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+
+    with open(xml_file, "rb") as f:
+        f.seek(offset)
+        try:
+            while True:
+                chunk = f.read(chunk_size)
+                parser.Parse(chunk, not chunk)
+                if not chunk:
+                    break
+        except _StackEnd:
+            pass
+    return actions
+
+
+
+def benchmarkIndex(stack_count=10000, actions_per_stack=10):
+    """Compare listing names with a full ElementTree parse against the streaming scan."""
+    import tempfile
+    import tracemalloc
+    from stackStore import readStacksXML, writeStacksXML
+
+    xml_file = os.path.join(tempfile.mkdtemp(), "saved_stacks.xml")
+    writeStacksXML(xml_file, [
+        (f"Stack {i}", [{"name": f"Function {j}", "index": str(j), "value": f"value {i};{j}"}
+                        for j in range(actions_per_stack)])
+        for i in range(stack_count)
+    ])
+    size_mb = os.path.getsize(xml_file) / (1024 * 1024)
+    print(f"{stack_count} stacks, {size_mb:.1f} MB")
+
+    def measure(label, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        # Memory is measured on a second run; tracemalloc would skew the timing.
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<28} {elapsed * 1000:9.1f} ms, peak {peak / (1024 * 1024):7.2f} MB")
+        return result
+
+    measure("names via full parse", lambda: [name for name, _ in readStacksXML(xml_file)])
+    index = measure("names via streaming index", lambda: list(scanStackIndex(xml_file)))
+    measure("count only (no list kept)", lambda: sum(1 for _ in scanStackIndex(xml_file)))
+
+    last = index[-1]
+    measure("last stack via full parse", lambda: readStacksXML(xml_file)[-1][1])
+    measure("last stack via offset", lambda: loadStackAt(xml_file, last.offset))
+    os.remove(xml_file)
+
+
+
+if __name__ == "__main__":
+    benchmarkIndex()
@@ -0,0 +1,137 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+LOCK_TIMEOUT = 30.0
+LOCK_POLL_INTERVAL = 0.002
+
+
+
+def lockPathFor(path):
+    """Return the sidecar lock file of a stack library: saved_stacks.xml -> saved_stacks.xml.lock."""
+    return path + ".lock"
+
+
+
+def _tryLock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+
+@contextmanager
+def fileLock(path, timeout=LOCK_TIMEOUT):
+    """Hold an exclusive cross-process lock on a stack library for the duration of the block.
+
+    The lock lives on a sidecar file (never deleted, so every process locks
+    the same inode) and is also exclusive between threads, since each call
+    opens its own handle. Raises TimeoutError after timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    with open(lockPathFor(path), "a+b") as f:
+        while not _tryLock(f):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for the lock on {path}")
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+
+def _stressWorker(args):
+    """Hammer one store from a worker process: own stacks plus a shared counter stack."""
+    from stackStore import openStackStore, stackVersion, StackConflictError, NEW_STACK
+
+    path, worker, rounds = args
+    store = openStackStore(path)
+    conflicts = 0
+    for i in range(rounds):
+        store.upsertStack(f"worker {worker}", [{"name": "Round", "index": "0", "value": str(i)}])
+        if i % 10 == 0:
+            store.duplicateStack(f"worker {worker}", f"worker {worker} copy {i}")
+            store.deleteStack(f"worker {worker} copy {i - 10}")
+
+        # Optimistic read-modify-write: retry until our version is the one we replace.
+        while True:
+            actions = store.getStack("counter")
+            count = int(actions[0]["value"]) if actions else 0
+            try:
+                store.upsertStack("counter", [{"name": "Count", "index": "0", "value": str(count + 1)}],
+                                  stackVersion(actions) if actions is not None else NEW_STACK)
+                break
+            except StackConflictError:
+                conflicts += 1
+    return conflicts
+
+
+
+def stressStackStore(path, processes=8, rounds=100):
+    """Run processes workers against one library at once and check nothing was lost.
+
+    Every worker rewrites its own stack, duplicates and deletes copies of it
+    and increments a shared counter stack with optimistic version checks.
+    At the end every worker stack must hold its last round, exactly one copy
+    per worker must be left, and the counter must equal processes * rounds.
+    """
+    import multiprocessing
+    from stackStore import openStackStore
+
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with context.Pool(processes) as pool:
+        conflicts = sum(pool.map(_stressWorker, [(path, w, rounds) for w in range(processes)]))
+    elapsed = time.perf_counter() - start
+
+    store = openStackStore(path)
+    names = store.listNames()
+    errors = []
+    for w in range(processes):
+        actions = store.getStack(f"worker {w}")
+        if not actions or actions[0]["value"] != str(rounds - 1):
+            errors.append(f"worker {w} stack lost its last save: {actions}")
+        copies = [n for n in names if n.startswith(f"worker {w} copy ")]
+        if len(copies) != 1:
+            errors.append(f"worker {w} left copies {copies}")
+    count = int(store.getStack("counter")[0]["value"])
+    if count != processes * rounds:
+        errors.append(f"counter is {count}, expected {processes * rounds}")
+
+    print(f"{os.path.basename(path):<24} {processes} processes x {rounds} rounds: {elapsed:6.2f}s, "
+          f"{conflicts} version conflicts retried, {'OK' if not errors else 'FAILED'}")
+    for error in errors:
+        print("  " + error)
+    return not errors
+
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    folder = tempfile.mkdtemp()
+    for file_name in ("saved_stacks.xml", "saved_stacks.journal", "saved_stacks.db"):
+        stressStackStore(os.path.join(folder, file_name))
@@ -0,0 +1,127 @@
+import time
+from collections import namedtuple
+
+
+# One resolved row of a stack: which row it came from (for error highlighting),
+# the callable to run and the already coerced positional arguments.
+PlanStep = namedtuple("PlanStep", ["row", "friendly_name", "key", "func", "args"])
+
+# A compiled stack. Both fields are tuples so a plan can be shared and re-run
+# without anyone mutating it underneath.
+StackPlan = namedtuple("StackPlan", ["steps", "warnings"])
+
+
+
+def inputArguments(func_def, values):
+    """Turn the input values of an action into the positional arguments for its callable.
+
+    The one rule for headless runs and GUI rows alike: functions without
+    declared inputs get their single free value, or nothing when it is
+    empty; functions with inputs get one or two arguments, empty ones
+    falling back to the XML defaults.
+    """
+    values = [(v or "").strip() for v in values]
+    inputs = func_def.get("inputs", [])
+    if not inputs:
+        return [values[0]] if values and values[0] else []
+
+    num_args = 1 if len(inputs) == 1 else 2
+    return [(values[i] if i < len(values) else "") or inputs[i]["default_value"] for i in range(num_args)]
+
+
+
+def actionArguments(func_def, value):
+    """Turn a saved action value (inputs joined with ';') into the positional arguments for its callable."""
+    value = (value or "").strip()
+    if not func_def.get("inputs", []):
+        return inputArguments(func_def, [value])
+    num_args = 1 if len(func_def["inputs"]) == 1 else 2
+    return inputArguments(func_def, value.split(";", num_args - 1) if value else [])
+
+
+
+def compileStack(actions, function_registry, action_functions):
+    """Resolve a list of actions into an immutable StackPlan.
+
+    Each action is a dict with a "name" and either "args" (values already read
+    from input widgets) or "value" (the string saveStack writes); both go
+    through inputArguments. Names are resolved through a FunctionRegistry.
+    Rows whose name or definition key cannot be resolved become warnings,
+    exactly as runAllActions reports them, and are left out of the plan.
+    """
+    steps = []
+    warnings = []
+    for row_index, action in enumerate(actions):
+        friendly_name = action["name"]
+        func_def = function_registry.byName(friendly_name)
+        if func_def is None:
+            warnings.append(f"No function definition found for '{friendly_name}'")
+            continue
+        lookup_key = func_def["definition"].strip()
+        action_func = action_functions.get(lookup_key)
+        if action_func is None:
+            warnings.append(f"No function found for key '{lookup_key}'")
+            continue
+        if "args" in action:
+            args = tuple(inputArguments(func_def, action["args"]))
+        else:
+            args = tuple(actionArguments(func_def, action.get("value", "")))
+        steps.append(PlanStep(row_index, friendly_name, lookup_key, action_func, args))
+
+    return StackPlan(tuple(steps), tuple(warnings))
+
+
+
+def newResult(plan, stack_name=""):
+    """Return the empty result dict a run of plan fills in."""
+    return {
+        "stack_name": stack_name,
+        "success": True,
+        "warnings": list(plan.warnings),
+        "log_messages": [],
+        "error": None,
+        "error_row": None,
+        "timings": []
+    }
+
+
+
+def runStep(step, result):
+    """Run one PlanStep, timing it with perf_counter_ns, and record it into result.
+
+    Returns False if the step raised, in which case result carries the error
+    and the row that raised it.
+    """
+    start = time.perf_counter_ns()
+    try:
+        output = step.func(*step.args)
+        if output is not None:
+            result["log_messages"].append(str(output))
+        ok = True
+    except Exception as e:
+        result["success"] = False
+        result["error"] = f"Error in {step.friendly_name}: {str(e)}"
+        result["error_row"] = step.row
+        ok = False
+    result["timings"].append({
+        "row": step.row,
+        "name": step.friendly_name,
+        "key": step.key,
+        "ns": time.perf_counter_ns() - start,
+        "ok": ok
+    })
+    return ok
+
+
+
+def runPlan(plan, stack_name=""):
+    """Run a compiled plan. Only the action calls happen here.
+
+    Every call is timed and listed in result["timings"]. The first exception
+    stops the run and is reported with the row of the step that raised it.
+    """
+    result = newResult(plan, stack_name)
+    for step in plan.steps:
+        if not runStep(step, result):
+            break
+    return result
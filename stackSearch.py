@@ -0,0 +1,176 @@
+import bisect
+import heapq
+import re
+import time
+
+
+# Query terms can be limited to one field with a prefix, e.g. "action:plot value:take_01".
+SEARCH_FIELDS = ("name", "action", "value")
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z_]+")
+
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+
+def stackTokens(name, actions):
+    """Return the set of (field, token) pairs a stack is found by."""
+    tokens = {("name", t) for t in tokenize(name)}
+    for action in actions:
+        tokens.update(("action", t) for t in tokenize(action["name"]))
+        tokens.update(("value", t) for t in tokenize(action.get("value", "") or ""))
+    return tokens
+
+
+
+class StackSearchIndex(object):
+    """In-memory inverted index over stack names, action names and argument values.
+
+    Every query term must match (AND), as a prefix of a token, so results
+    narrow as the user types. Stacks are added, replaced and removed one at
+    a time, so saves, deletes and duplicates do not rebuild the index.
+    Postings hold integer stack ids in library order, which keeps set
+    operations and result ordering cheap.
+    """
+
+    def __init__(self, stacks=()):
+        self._postings = {}  # (field, token) -> set of stack ids
+        self._vocab = {field: [] for field in SEARCH_FIELDS}  # Sorted tokens per field, for prefix ranges
+        self._ids = {}  # stack name -> id; ids grow in library order
+        self._names = {}  # id -> stack name
+        self._tokens = {}  # id -> the stack's (field, token) pairs
+        self._next_id = 0
+        self._term_cache = {}  # (field or None, prefix) -> matching ids; cleared on every change
+
+        # Bulk build: fill the postings first, sort each vocabulary once.
+        for name, actions in stacks:
+            self._addPostings(name, stackTokens(name, actions))
+        for field, token in self._postings:
+            self._vocab[field].append(token)
+        for tokens in self._vocab.values():
+            tokens.sort()
+
+    @classmethod
+    def fromStore(cls, store):
+        return cls(store.allStacks())
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def _addPostings(self, name, tokens):
+        stack_id = self._next_id
+        self._next_id += 1
+        self._ids[name] = stack_id
+        self._names[stack_id] = name
+        self._tokens[stack_id] = tokens
+        new_keys = []
+        for key in tokens:
+            ids = self._postings.get(key)
+            if ids is None:
+                ids = self._postings[key] = set()
+                new_keys.append(key)
+            ids.add(stack_id)
+        return new_keys
+
+    def addStack(self, name, actions):
+        """Index a stack, replacing what was indexed under its name before."""
+        self.removeStack(name)
+        self._term_cache.clear()
+        for field, token in self._addPostings(name, stackTokens(name, actions)):
+            bisect.insort(self._vocab[field], token)
+
+    def removeStack(self, name):
+        stack_id = self._ids.pop(name, None)
+        if stack_id is None:
+            return
+        self._term_cache.clear()
+        del self._names[stack_id]
+        for key in self._tokens.pop(stack_id):
+            ids = self._postings[key]
+            ids.discard(stack_id)
+            if not ids:
+                del self._postings[key]
+                vocab = self._vocab[key[0]]
+                del vocab[bisect.bisect_left(vocab, key[1])]
+
+    def _matchTerm(self, field, prefix):
+        """Return the ids with a token starting with prefix, in field or in any field when field is None.
+
+        Cached until the next change, so each keystroke only pays for its new term.
+        """
+        key = (field, prefix)
+        matches = self._term_cache.get(key)
+        if matches is None:
+            if field is None:
+                matches = frozenset().union(*[self._matchTerm(f, prefix) for f in SEARCH_FIELDS])
+            else:
+                vocab = self._vocab[field]
+                # Tokens only hold [0-9a-z_], all of which sort before "{".
+                tokens = vocab[bisect.bisect_left(vocab, prefix):bisect.bisect_left(vocab, prefix + "{")]
+                postings = self._postings
+                matches = frozenset().union(*[postings[(field, t)] for t in tokens])
+            self._term_cache[key] = matches
+        return matches
+
+    def search(self, query, limit=None):
+        """Return the names of the stacks matching every term of query, in library order.
+
+        An empty query returns nothing; callers show the full list instead.
+        """
+        term_matches = []
+        for term in query.split():
+            field, _, text = term.rpartition(":")
+            if field not in SEARCH_FIELDS:
+                field, text = None, term
+            term_matches.extend(self._matchTerm(field, prefix) for prefix in tokenize(text))
+        if not term_matches:
+            return []
+        term_matches.sort(key=len)  # Intersect starting from the rarest term
+        result = term_matches[0].intersection(*term_matches[1:])
+        ids = sorted(result) if limit is None else heapq.nsmallest(limit, result)
+        return [self._names[i] for i in ids]
+
+
+
+def benchmarkSearch(stack_count=10000, actions_per_stack=10):
+    """Time building the index for a generated library and a handful of type-ahead queries."""
+    functions = ["PlotToControlRig", "Plot To Skeleton", "Set Take", "Key Selected", "Bake Layer"]
+    stacks = [
+        (f"Shot {i:05d} cleanup", [
+            {"name": functions[(i + j) % len(functions)], "index": str(j), "value": f"take_{i % 500:03d};{j}"}
+            for j in range(actions_per_stack)
+        ])
+        for i in range(stack_count)
+    ]
+
+    start = time.perf_counter()
+    index = StackSearchIndex(stacks)
+    print(f"Indexed {stack_count} stacks in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for query in ("s", "shot 0", "cleanup", "action:plottocontrolrig value:take_042", "plot take_4", "nothing"):
+        index._term_cache.clear()  # Time the first keystroke, not a cached repeat
+        start = time.perf_counter()
+        found = index.search(query)
+        elapsed = time.perf_counter() - start
+        index._term_cache.clear()
+        start = time.perf_counter()
+        index.search(query, limit=200)
+        limited = time.perf_counter() - start
+        print(f"{query!r:<44} {len(found):>6} hits {elapsed * 1000:7.2f} ms, first 200 {limited * 1000:7.2f} ms")
+
+    start = time.perf_counter()
+    index.addStack("Shot 99999 cleanup", stacks[0][1])
+    index.removeStack("Shot 00001 cleanup")
+    print(f"One add and one remove: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+
+if __name__ == "__main__":
+    benchmarkSearch()
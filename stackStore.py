@@ -0,0 +1,727 @@
+import abc
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from xml.parsers import expat
+
+import stackCache
+from stackIndex import scanStackIndex, loadStackAt
+from stackLock import fileLock
+
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+JOURNAL_EXTENSIONS = (".journal",)
+# Compact once the journal holds this many records and at least twice as many as live stacks.
+JOURNAL_COMPACT_MIN = 200
+# expected_version for a save that must create the stack, not overwrite one.
+NEW_STACK = ""
+
+
+
+class StackConflictError(Exception):
+    """A stack changed (in another session) since the version the caller last read."""
+
+    def __init__(self, name, expected_version, actual_version):
+        self.name = name
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super(StackConflictError, self).__init__(
+            f"Stack '{name}' changed since it was read (expected {expected_version or 'no stack'}, "
+            f"found {actual_version or 'no stack'})"
+        )
+
+
+
+def stackVersion(actions):
+    """Return a short content hash of a stack's actions, or None for a missing stack.
+
+    Versions are derived from content, so they need no storage and agree
+    across backends and processes.
+    """
+    if actions is None:
+        return None
+    canonical = [[a["name"], str(a.get("index", "") or ""), a.get("value", "") or ""] for a in actions]
+    return hashlib.sha1(json.dumps(canonical, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+
+
+def checkVersion(name, current_actions, expected_version):
+    """Raise StackConflictError unless the current stack matches expected_version.
+
+    None skips the check; NEW_STACK requires that the stack does not exist.
+    """
+    if expected_version is None:
+        return
+    actual_version = stackVersion(current_actions)
+    if (actual_version or NEW_STACK) != expected_version:
+        raise StackConflictError(name, expected_version, actual_version)
+
+
+
+def writeStacksXML(xml_file, stacks):
+    """Write (name, actions) pairs in the saved_stacks.xml format saveStack always used.
+
+    The file is written to a temporary sibling and renamed over the old one,
+    so a crash mid-write never leaves a half-written library behind.
+    Returns the fileStamp of the written file.
+    """
+    root = ET.Element("Stacks")
+    for name, actions in stacks:
+        stack_element = ET.SubElement(root, "Stack", name=name)
+        for action in actions:
+            ET.SubElement(stack_element, "Action", name=action["name"],
+                          index=str(action.get("index", "") or ""), value=action.get("value", "") or "")
+    ET.indent(root, space="  ", level=0)
+    pretty_xml = ET.tostring(root, encoding="unicode")
+
+    temp_file = xml_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(pretty_xml)
+    # Stamp the temp file: the rename keeps it, and a later write by someone else will not match.
+    stamp = stackCache.fileStamp(temp_file)
+    os.replace(temp_file, xml_file)
+    return stamp
+
+
+
+def readStacksXML(xml_file):
+    """Read every stack of a saved_stacks.xml file as a list of (name, actions) pairs."""
+    root = ET.parse(xml_file).getroot()
+    stacks = []
+    for stack_element in root.findall("Stack"):
+        name = stack_element.get("name")
+        if not name:
+            continue
+        stacks.append((name, [
+            {
+                "name": action.get("name", "").strip(),
+                "index": action.get("index", ""),
+                "value": action.get("value", "")
+            }
+            for action in stack_element.findall("Action")
+        ]))
+    return stacks
+
+
+
+class StackStore(abc.ABC):
+    """Interface every stack library backend implements.
+
+    Stacks are ordered lists of action dicts ({"name", "index", "value"}), the
+    same shape saveStack writes to saved_stacks.xml. A backend missing any
+    of the abstract methods fails when it is created.
+    """
+
+    history = None  # StackHistory attached by openStackStore; every change is recorded in it
+
+    @abc.abstractmethod
+    def listNames(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def getStack(self, name):
+        """Return the actions of a stack, or None if it does not exist."""
+        raise NotImplementedError
+
+    def getStackVersion(self, name):
+        """Return the stackVersion of a stack, or None if it does not exist."""
+        return stackVersion(self.getStack(name))
+
+    @abc.abstractmethod
+    def upsertStack(self, name, actions, expected_version=None):
+        """Create or replace one stack.
+
+        With expected_version, raises StackConflictError if the stored stack
+        is no longer that version (see checkVersion).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def deleteStack(self, name, expected_version=None):
+        """Delete one stack. Returns False if it did not exist."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def renameStack(self, name, new_name):
+        """Rename a stack. Returns False if it does not exist or new_name is taken."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def duplicateStack(self, name, new_name):
+        """Copy a stack under a new name. Returns False if it does not exist or new_name is taken."""
+        raise NotImplementedError
+
+    def allStacks(self):
+        """Return every stack as (name, actions) pairs, in library order."""
+        return [(name, self.getStack(name)) for name in self.listNames()]
+
+    def upsertStacks(self, stacks, expected_versions=None):
+        """Create or replace many (name, actions) stacks in one transaction.
+
+        Stacks identical to the stored ones are skipped. expected_versions
+        maps names to the version each must still have (see checkVersion);
+        if any differs, StackConflictError is raised and nothing is
+        written. Returns the names actually written.
+        """
+        for name, expected_version in (expected_versions or {}).items():
+            checkVersion(name, self.getStack(name), expected_version)
+        written = []
+        for name, actions in stacks:
+            if stackVersion(self.getStack(name)) != stackVersion(actions):
+                self.upsertStack(name, actions)
+                written.append(name)
+        return written
+
+    def _recordRevisions(self, stacks, previous=None):
+        if self.history is not None:
+            self.history.record(stacks, previous)
+
+    def _recordDelete(self, name, actions):
+        if self.history is not None:
+            self.history.recordDelete(name, actions)
+
+    def _recordRename(self, name, new_name):
+        if self.history is not None:
+            self.history.recordRename(name, new_name)
+
+    def stackHistory(self, name):
+        """Return the StackRevisions of a stack, newest first (empty without a history)."""
+        return self.history.revisions(name) if self.history is not None else []
+
+    def rollbackStack(self, name, version, expected_version=None):
+        """Restore a stack, deleted or not, to an earlier revision. Returns False if the version is unknown."""
+        actions = self.history.getRevision(version) if self.history is not None else None
+        if actions is None:
+            return False
+        self.upsertStack(name, actions, expected_version)
+        return True
+
+    def importXML(self, xml_file):
+        """Upsert every stack of a saved_stacks.xml file. Returns how many were imported."""
+        stacks = readStacksXML(xml_file)
+        self.upsertStacks(stacks)
+        return len(stacks)
+
+    def exportXML(self, xml_file):
+        """Write the whole library in the saved_stacks.xml format."""
+        writeStacksXML(xml_file, self.allStacks())
+
+
+
+class XMLStackStore(StackStore):
+    """The original single-file saved_stacks.xml library.
+
+    Every mutation still rewrites the file, but only here, and atomically.
+    Mutations hold the cross-process file lock and re-read the file inside
+    it, so each one merges a single stack into whatever other sessions
+    wrote meanwhile instead of overwriting it.
+    Reads go through stackCache, so the file is parsed once per change no
+    matter how many stores, popups or engines read it. Stacks come back as
+    immutable StackRecord actions; copy them before editing.
+
+    Listing names and loading a single stack do not need the whole tree:
+    unless a full parse is already cached, they use the streaming index
+    from stackIndex and read only the requested stack from its offset.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _parse(self, path):
+        if os.path.getsize(path) == 0:
+            return []
+        try:
+            return readStacksXML(path)
+        except ET.ParseError:
+            # Keep the damaged file around instead of silently overwriting it.
+            backup = path + ".corrupt"
+            shutil.copyfile(path, backup)
+            print(f"Error: XML file corrupted. A copy was saved to {backup}.")
+            return []
+
+    def _load(self):
+        return [(record.name, record.actions) for record in stackCache.getStacks(self.path, self._parse)]
+
+    def _save(self, stacks):
+        stamp = writeStacksXML(self.path, stacks)
+        stackCache.updateStacks(self.path, stamp, stacks)
+
+    def _index(self):
+        """Return the cached streaming index, or None if the file is missing, empty or broken."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        try:
+            return stackCache.getIndex(self.path, scanStackIndex)
+        except expat.ExpatError:
+            return None
+
+    def listNames(self):
+        current = stackCache.currentStacks(self.path)
+        if current is not None:
+            return [record.name for record in current[1]]
+        index = self._index()
+        if index is None:
+            return [name for name, _ in self._load()]  # Reports and backs up a broken file
+        return [entry.name for entry in index[1]]
+
+    def getStack(self, name):
+        current = stackCache.currentStacks(self.path)
+        if current is not None:
+            record = current[0].get(name)
+            return record.actions if record else None
+        stamp = stackCache.fileStamp(self.path)
+        index = self._index()
+        if index is None:
+            return next((actions for stack_name, actions in self._load() if stack_name == name), None)
+        entry = index[0].get(name)
+        if entry is None:
+            return None
+        try:
+            actions = loadStackAt(self.path, entry.offset)
+        except expat.ExpatError:
+            actions = None
+        if actions is None or stackCache.fileStamp(self.path) != stamp:
+            # Another session replaced the file while we read it, so the offset may point into
+            # the new file; fall back to a full parse of whatever is there now.
+            return next((actions for stack_name, actions in self._load() if stack_name == name), None)
+        return stackCache.freezeStacks([(name, actions)])[0].actions
+
+    def allStacks(self):
+        return self._load()
+
+    def upsertStack(self, name, actions, expected_version=None):
+        with fileLock(self.path):
+            stacks = self._load()
+            current = next((a for n, a in stacks if n == name), None)
+            checkVersion(name, current, expected_version)
+            stacks = [(n, a) for n, a in stacks if n != name]
+            stacks.append((name, list(actions)))
+            self._save(stacks)
+            self._recordRevisions([(name, actions)], {name: current})
+
+    def deleteStack(self, name, expected_version=None):
+        with fileLock(self.path):
+            stacks = self._load()
+            current = next((a for n, a in stacks if n == name), None)
+            checkVersion(name, current, expected_version)
+            if current is None:
+                return False
+            self._save([(n, a) for n, a in stacks if n != name])
+            self._recordDelete(name, current)
+            return True
+
+    def renameStack(self, name, new_name):
+        with fileLock(self.path):
+            stacks = self._load()
+            names = [n for n, _ in stacks]
+            if name not in names or new_name in names:
+                return False
+            self._save([(new_name if n == name else n, a) for n, a in stacks])
+            self._recordRename(name, new_name)
+            return True
+
+    def duplicateStack(self, name, new_name):
+        with fileLock(self.path):
+            stacks = self._load()
+            source = next((a for n, a in stacks if n == name), None)
+            if source is None or any(n == new_name for n, _ in stacks):
+                return False
+            stacks.append((new_name, source))
+            self._save(stacks)
+            self._recordRevisions([(new_name, source)])
+            return True
+
+    def upsertStacks(self, stacks, expected_versions=None):
+        with fileLock(self.path):
+            existing = self._load()
+            current = dict(existing)
+            for name, expected_version in (expected_versions or {}).items():
+                checkVersion(name, current.get(name), expected_version)
+            incoming = dict((n, a) for n, a in stacks if stackVersion(current.get(n)) != stackVersion(a))
+            if incoming:
+                self._save([(n, a) for n, a in existing if n not in incoming] + list(incoming.items()))
+                self._recordRevisions(incoming.items(), current)
+        return list(incoming)
+
+
+
+class SQLiteStackStore(StackStore):
+    """Stack library in SQLite: one row per stack, one row per action.
+
+    Upsert, delete, rename and duplicate touch only the rows of the stack
+    involved, so their cost does not grow with the size of the library.
+    Writes take SQLite's write lock up front (BEGIN IMMEDIATE), so version
+    checks and the change they guard are atomic across processes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stacks (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS actions (
+            stack_id INTEGER NOT NULL REFERENCES stacks(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            idx TEXT NOT NULL DEFAULT '',
+            value TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (stack_id, position)
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def _writeTransaction(self):
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            yield
+
+    def _stackId(self, name):
+        row = self.connection.execute("SELECT id FROM stacks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _insertActions(self, stack_id, actions):
+        self.connection.executemany(
+            "INSERT INTO actions (stack_id, position, name, idx, value) VALUES (?, ?, ?, ?, ?)",
+            [(stack_id, position, a["name"], str(a.get("index", "") or ""), a.get("value", "") or "")
+             for position, a in enumerate(actions)]
+        )
+
+    def listNames(self):
+        return [row[0] for row in self.connection.execute("SELECT name FROM stacks ORDER BY id")]
+
+    def getStack(self, name):
+        stack_id = self._stackId(name)
+        if stack_id is None:
+            return None
+        rows = self.connection.execute(
+            "SELECT name, idx, value FROM actions WHERE stack_id = ? ORDER BY position", (stack_id,)
+        )
+        return [{"name": n, "index": i, "value": v} for n, i, v in rows]
+
+    def _replaceStack(self, name, actions):
+        stack_id = self._stackId(name)
+        if stack_id is None:
+            stack_id = self.connection.execute("INSERT INTO stacks (name) VALUES (?)", (name,)).lastrowid
+        else:
+            self.connection.execute("DELETE FROM actions WHERE stack_id = ?", (stack_id,))
+        self._insertActions(stack_id, actions)
+
+    def upsertStack(self, name, actions, expected_version=None):
+        with self._writeTransaction():
+            current = self.getStack(name)
+            checkVersion(name, current, expected_version)
+            self._replaceStack(name, actions)
+            self._recordRevisions([(name, actions)], {name: current})
+
+    def deleteStack(self, name, expected_version=None):
+        with self._writeTransaction():
+            current = self.getStack(name)
+            checkVersion(name, current, expected_version)
+            if current is None:
+                return False
+            self.connection.execute("DELETE FROM stacks WHERE name = ?", (name,))
+            self._recordDelete(name, current)
+            return True
+
+    def renameStack(self, name, new_name):
+        with self._writeTransaction():
+            if self._stackId(new_name) is not None:
+                return False
+            if self.connection.execute("UPDATE stacks SET name = ? WHERE name = ?", (new_name, name)).rowcount == 0:
+                return False
+            self._recordRename(name, new_name)
+            return True
+
+    def duplicateStack(self, name, new_name):
+        with self._writeTransaction():
+            stack_id = self._stackId(name)
+            if stack_id is None or self._stackId(new_name) is not None:
+                return False
+            new_id = self.connection.execute("INSERT INTO stacks (name) VALUES (?)", (new_name,)).lastrowid
+            self.connection.execute(
+                "INSERT INTO actions (stack_id, position, name, idx, value) "
+                "SELECT ?, position, name, idx, value FROM actions WHERE stack_id = ?", (new_id, stack_id)
+            )
+            self._recordRevisions([(new_name, self.getStack(new_name))])
+            return True
+
+    def upsertStacks(self, stacks, expected_versions=None):
+        # One transaction for all of them instead of one per stack.
+        written = {}
+        previous = {}
+        with self._writeTransaction():
+            for name, expected_version in (expected_versions or {}).items():
+                checkVersion(name, self.getStack(name), expected_version)
+            for name, actions in stacks:
+                current = self.getStack(name)
+                if stackVersion(current) != stackVersion(actions):
+                    self._replaceStack(name, actions)
+                    written[name] = actions
+                    previous.setdefault(name, current)
+            self._recordRevisions(written.items(), previous)
+        return list(written)
+
+
+
+class JournalStackStore(StackStore):
+    """Stack library as an append-only journal of JSON lines.
+
+    Each mutation appends one add, replace, delete or rename record, so a save
+    costs the size of one stack instead of a rewrite of the whole library,
+    and a crash can at worst tear the last line, which is dropped. Once dead
+    records pile up, a worker thread compacts the journal into one add record
+    per live stack and swaps it in with an atomic rename.
+
+    Appends and the final swap of a compaction hold the cross-process file
+    lock; appends made by other processes are picked up by replaying the
+    journal from the last offset read, and a compaction by another process
+    by its new header line.
+    """
+
+    def __init__(self, path, compact_min=JOURNAL_COMPACT_MIN):
+        self.path = path
+        self.compact_min = compact_min
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # One compaction at a time per store
+        self._stacks = {}  # name -> frozen actions, in library order
+        self._records = 0  # Records in the journal, live or dead
+        self._offset = 0  # Bytes of the journal replayed into _stacks
+        self._header = None  # First line of the journal; changes whenever it is compacted
+        self._stamp = None
+        self._compactor = None
+        self._refresh()
+
+    @staticmethod
+    def _encode(record):
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _newHeader(self):
+        return self._encode({"op": "journal", "name": uuid.uuid4().hex})
+
+    def _apply(self, record):
+        op = record["op"]
+        name = record["name"]
+        if op == "journal":
+            return
+        if op in ("add", "replace"):
+            self._stacks.pop(name, None)
+            self._stacks[name] = stackCache.freezeStacks([(name, record["actions"])])[0].actions
+        elif op == "delete":
+            self._stacks.pop(name, None)
+        elif op == "rename":
+            new_name = record["new_name"]
+            self._stacks = {(new_name if n == name else n): a for n, a in self._stacks.items()}
+        self._records += 1
+
+    def _refresh(self):
+        """Replay what was appended since the last read, or everything if the file was replaced."""
+        with self._lock:
+            stamp = stackCache.fileStamp(self.path)
+            if stamp == self._stamp:
+                return
+            if stamp is None:
+                self._stacks, self._records, self._offset, self._header = {}, 0, 0, None
+            else:
+                with open(self.path, "rb") as f:
+                    # A different first line means the journal was compacted (or recreated) meanwhile.
+                    header = f.readline()
+                    if header != self._header or stamp[1] < self._offset:
+                        self._stacks, self._records, self._offset = {}, 0, 0
+                        self._header = header if header.endswith(b"\n") else None
+                    f.seek(self._offset)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # Torn last record; it is dropped by the next append
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            print(f"Error: skipping a damaged record in {self.path}.")
+                        else:
+                            self._apply(record)
+                        self._offset += len(line)
+            self._stamp = stamp
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and the cross-process file lock, with the journal replayed."""
+        with self._lock, fileLock(self.path):
+            self._refresh()
+            yield
+
+    def _append(self, records):
+        """Append records; the caller holds _locked()."""
+        data = b"".join(self._encode(r) for r in records)
+        if self._header is None:
+            self._header = self._newHeader()
+            data = self._header + data
+        with open(self.path, "ab") as f:
+            if f.tell() > self._offset:
+                f.truncate(self._offset)  # Drop a torn record left by a crash
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._offset += len(data)
+        for record in records:
+            self._apply(record)
+        self._stamp = stackCache.fileStamp(self.path)
+
+    def _maybeCompact(self):
+        with self._lock:
+            if self._records < max(self.compact_min, 2 * len(self._stacks)):
+                return
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="StackJournalCompaction", daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Rewrite the journal as one add record per live stack and rename it into place.
+
+        The snapshot is written without holding the locks; records appended
+        meanwhile are copied over before the rename. If another process (or
+        another store on the same journal) compacted first, this compaction
+        is dropped. Each compaction writes its own temp file.
+        """
+        with self._compact_lock:
+            with self._lock:
+                self._refresh()
+                stacks = list(self._stacks.items())
+                offset = self._offset
+                old_header = self._header
+
+            # Unique per compaction, and created with the usual permissions (unlike mkstemp's 0600),
+            # since it is renamed over the shared journal.
+            temp_file = f"{self.path}.{uuid.uuid4().hex}.compact"
+            try:
+                header = self._newHeader()
+                with open(temp_file, "wb") as f:
+                    f.write(header)
+                    for name, actions in stacks:
+                        f.write(self._encode({"op": "add", "name": name, "actions": [dict(a) for a in actions]}))
+                    snapshot_size = f.tell()
+
+                with self._lock, fileLock(self.path):
+                    with open(self.path, "rb") as journal:
+                        if journal.readline() != old_header:
+                            return
+                        journal.seek(offset)
+                        tail = journal.read()
+                    tail = tail[:tail.rfind(b"\n") + 1]  # Complete records only
+                    applied = self._offset - offset
+                    with open(temp_file, "ab") as f:
+                        f.write(tail)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_file, self.path)
+                    self._header = header
+                    self._offset = snapshot_size + applied
+                    self._records = len(stacks) + tail[:applied].count(b"\n")
+                    self._stamp = None  # Replay anything in the tail we had not read yet
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    def listNames(self):
+        self._refresh()
+        return list(self._stacks)
+
+    def getStack(self, name):
+        self._refresh()
+        return self._stacks.get(name)
+
+    def allStacks(self):
+        self._refresh()
+        return list(self._stacks.items())
+
+    def upsertStack(self, name, actions, expected_version=None):
+        with self._locked():
+            current = self._stacks.get(name)
+            checkVersion(name, current, expected_version)
+            op = "replace" if name in self._stacks else "add"
+            self._append([{"op": op, "name": name, "actions": [dict(a) for a in actions]}])
+            self._recordRevisions([(name, actions)], {name: current})
+        self._maybeCompact()
+
+    def deleteStack(self, name, expected_version=None):
+        with self._locked():
+            current = self._stacks.get(name)
+            checkVersion(name, current, expected_version)
+            if current is None:
+                return False
+            self._append([{"op": "delete", "name": name}])
+            self._recordDelete(name, current)
+        self._maybeCompact()
+        return True
+
+    def renameStack(self, name, new_name):
+        with self._locked():
+            if name not in self._stacks or new_name in self._stacks:
+                return False
+            self._append([{"op": "rename", "name": name, "new_name": new_name}])
+            self._recordRename(name, new_name)
+        self._maybeCompact()
+        return True
+
+    def duplicateStack(self, name, new_name):
+        with self._locked():
+            source = self._stacks.get(name)
+            if source is None or new_name in self._stacks:
+                return False
+            self._append([{"op": "add", "name": new_name, "actions": [dict(a) for a in source]}])
+            self._recordRevisions([(new_name, source)])
+        self._maybeCompact()
+        return True
+
+    def upsertStacks(self, stacks, expected_versions=None):
+        # One append for all of them.
+        with self._locked():
+            for name, expected_version in (expected_versions or {}).items():
+                checkVersion(name, self._stacks.get(name), expected_version)
+            incoming = dict((n, a) for n, a in stacks if stackVersion(self._stacks.get(n)) != stackVersion(a))
+            if incoming:
+                previous = {name: self._stacks.get(name) for name in incoming}
+                self._append([{"op": "replace" if name in self._stacks else "add", "name": name,
+                               "actions": [dict(a) for a in actions]}
+                              for name, actions in incoming.items()])
+                self._recordRevisions(incoming.items(), previous)
+        self._maybeCompact()
+        return list(incoming)
+
+
+
+def openStackStore(path, history=False):
+    """Open the stack library at path.
+
+    SQLite for .db/.sqlite files, an append-only journal for .journal files,
+    saved_stacks.xml otherwise. With history, every change is also recorded
+    in a StackHistory next to the library (see stackHistory); that is a
+    second SQLite write per save, so only the GUI, which shows the history,
+    turns it on.
+    """
+    from stackHistory import StackHistory, revisionHistoryPathFor  # stackHistory imports this module
+
+    lowered = path.lower()
+    if lowered.endswith(SQLITE_EXTENSIONS):
+        store = SQLiteStackStore(path)
+    elif lowered.endswith(JOURNAL_EXTENSIONS):
+        store = JournalStackStore(path)
+    else:
+        store = XMLStackStore(path)
+    if history:
+        store.history = StackHistory(revisionHistoryPathFor(path))
+    return store
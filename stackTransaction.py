@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+
+
+
+@contextmanager
+def stackTransaction(sdk, label="GUIGUI Stack"):
+    """Run a whole stack as one scene transaction.
+
+    Inside the block model changes are batched with FBBeginChangeAllModels,
+    which defers evaluation and viewport redraw, and everything is grouped
+    into a single undo step; FBEndChangeAllModels flushes once on the way
+    out. SDK builds (or stand-ins) without those calls fall back to a plain
+    block followed by a single Scene.Evaluate.
+    """
+    undo_manager = sdk.FBUndoManager() if hasattr(sdk, "FBUndoManager") else None
+    defer_changes = hasattr(sdk, "FBBeginChangeAllModels") and hasattr(sdk, "FBEndChangeAllModels")
+
+    in_undo = False
+    if undo_manager is not None:
+        try:
+            in_undo = bool(undo_manager.TransactionBegin(label))
+        except Exception as e:
+            print("Could not open undo transaction:", e)
+    changes_begun = False
+    try:
+        if defer_changes:
+            sdk.FBBeginChangeAllModels()
+            changes_begun = True
+        yield
+    finally:
+        if changes_begun:
+            sdk.FBEndChangeAllModels()
+        if in_undo:
+            undo_manager.TransactionEnd()
+        if not changes_begun:
+            try:
+                sdk.FBSystem().Scene.Evaluate()
+            except Exception as e:
+                print("Error evaluating scene:", e)
+
+
+
+def benchmarkTransactions(step_counts=(10, 50, 200), component_count=20000):
+    """Time plain versus transactional runs of stacks whose steps each force an evaluation.
+
+    This only checks the stand-in SDK, whose Evaluate is skipped while
+    changes are deferred; it says nothing about how much the real SDK
+    saves, which has to be measured in MotionBuilder.
+    """
+    import types
+    import pyfbsdkStandIn as sdk
+    from stackPlan import PlanStep, StackPlan, runPlan
+
+    sdk.buildSyntheticScene(component_count)
+    evaluate = lambda *args: sdk.FBSystem().Scene.Evaluate()
+    # Same SDK minus the deferral/undo calls, to time the fallback path too.
+    fallback_sdk = types.SimpleNamespace(FBSystem=sdk.FBSystem)
+
+    for steps in step_counts:
+        plan = StackPlan(tuple(PlanStep(i, "Evaluate", "Evaluate", evaluate, ()) for i in range(steps)), ())
+
+        start = time.perf_counter()
+        runPlan(plan)
+        plain = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with stackTransaction(fallback_sdk):
+            runPlan(plan)
+        fallback = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with stackTransaction(sdk):
+            runPlan(plan)
+        transactional = time.perf_counter() - start
+
+        print(f"{steps:>4} steps: plain {plain * 1000:8.2f} ms, fallback {fallback * 1000:8.2f} ms, "
+              f"transaction {transactional * 1000:8.2f} ms ({plain / transactional:5.1f}x)")
+
+
+
+if __name__ == "__main__":
+    benchmarkTransactions()
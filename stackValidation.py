@@ -0,0 +1,97 @@
+import inspect
+
+from stackPlan import actionArguments, inputArguments
+
+
+BOOL_VALUES = {"true", "false", "1", "0", "yes", "no", "on", "off"}
+
+# Signatures are cached per callable; inspect.signature is the slow part.
+_signature_cache = {}
+
+
+
+def _signature(func):
+    try:
+        return _signature_cache[func]
+    except KeyError:
+        pass
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError):
+        sig = None  # Builtins and some C callables cannot be inspected
+    _signature_cache[func] = sig
+    return sig
+
+
+
+def checkInputValue(spec, value):
+    """Return a problem message if value does not fit an InputSpec, else None."""
+    if spec.input_type == "Integer":
+        try:
+            int(value)
+        except (TypeError, ValueError):
+            return f"expects an Integer, got '{value}'"
+    elif spec.input_type == "Bool":
+        if str(value).strip().lower() not in BOOL_VALUES:
+            return f"expects a Bool, got '{value}'"
+    elif spec.input_type == "Dropdown":
+        if spec.options and value not in spec.options:
+            return f"'{value}' is not one of {', '.join(spec.options)}"
+    return None
+
+
+
+def validateStack(actions, function_registry, action_functions):
+    """Check every row of a stack without running anything.
+
+    Takes the same action dicts as compileStack and returns a list of
+    problems ({"row", "name", "message"}), all of them rather than the first:
+    unknown names, unknown ACTION_FUNCTIONS keys, argument counts that do not
+    bind to the callable's signature and values that do not match the XML
+    Input types. An empty list means the stack is safe to run.
+    """
+    problems = []
+    for row_index, action in enumerate(actions):
+        friendly_name = action["name"]
+
+        func_def = function_registry.byName(friendly_name)
+        if func_def is None:
+            problems.append({"row": row_index, "name": friendly_name,
+                             "message": f"No function definition found for '{friendly_name}'"})
+            continue
+        lookup_key = func_def["definition"].strip()
+        action_func = action_functions.get(lookup_key)
+        if action_func is None:
+            problems.append({"row": row_index, "name": friendly_name,
+                             "message": f"No function found for key '{lookup_key}'"})
+            continue
+
+        if "args" in action:
+            args = inputArguments(func_def, action["args"])
+        else:
+            args = actionArguments(func_def, action.get("value", ""))
+
+        sig = _signature(action_func)
+        if sig is not None:
+            try:
+                sig.bind(*args)
+            except TypeError as e:
+                problems.append({"row": row_index, "name": friendly_name,
+                                 "message": f"{len(args)} argument(s) do not fit {lookup_key}{sig}: {e}"})
+
+        for position, (spec, value) in enumerate(zip(function_registry.inputSpecs(friendly_name), args)):
+            message = checkInputValue(spec, value)
+            if message:
+                problems.append({"row": row_index, "name": friendly_name,
+                                 "message": f"Input {position + 1} {message}"})
+    return problems
+
+
+
+def formatProblems(problems):
+    """Render validation problems one per line, with 1-based row numbers."""
+    lines = []
+    for p in problems:
+        where = f"Row {p['row'] + 1}" if p["row"] is not None else "Stack"
+        lines.append(f"{where} ({p['name']}): {p['message']}")
+    return "\n".join(lines)
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat at the top of the repository.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+
+def _actions(*values):
+    return [{"name": "Plot", "index": str(i), "value": value} for i, value in enumerate(values)]
+
+
+def _plain(stack):
+    return None if stack is None else [dict(a) for a in stack]
+
+
+@pytest.fixture
+def actions():
+    """actions("a", "b") -> a stack of Plot actions with those values, indexed by position."""
+    return _actions
+
+
+@pytest.fixture
+def plain():
+    """plain(stack) -> the stack as plain dicts (stores may return frozen actions), or None."""
+    return _plain
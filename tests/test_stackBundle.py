@@ -0,0 +1,114 @@
+import gzip
+import json
+
+import pytest
+
+from functionRegistry import FunctionRegistry, appendFunctionDefinitions
+from stackBundle import BUNDLE_FORMAT, BUNDLE_VERSION, exportBundle, formatImportReport, importBundle, readBundle
+from stackStore import StackConflictError, openStackStore
+
+
+def writeBundle(path, records):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "bundle", "format": BUNDLE_FORMAT, "version": BUNDLE_VERSION}) + "\n")
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_export_import_round_trip(tmp_path, actions, plain):
+    source = openStackStore(str(tmp_path / "source.db"))
+    source.upsertStacks([("A", actions("a")), ("B", actions("b", "c"))])
+    bundle = str(tmp_path / "library.stacks.gz")
+    assert exportBundle(source, bundle) == 2
+
+    target = openStackStore(str(tmp_path / "target.journal"))
+    report = importBundle(target, bundle)
+    assert report["imported"] == 2
+    assert plain(target.getStack("B")) == actions("b", "c")
+    assert importBundle(target, bundle)["unchanged"] == 2
+
+
+@pytest.mark.parametrize("record", [
+    {"name": "A", "actions": []},
+    {"type": "stack", "actions": []},
+    {"type": "stack", "name": "A"},
+    {"type": "stack", "name": "A", "actions": [["Plot", "0"]]},
+    {"type": "function"},
+    {"type": "function", "definition": {"name": "X"}},
+    {"type": "function", "definition": {"name": "X", "definition": 5, "description": "", "inputs": []}},
+    {"type": "function", "definition": {"name": "X", "definition": "x", "inputs": []}},
+    {"type": "function", "definition": {"name": "X", "definition": "x", "description": "", "inputs": "oops"}},
+    {"type": "function", "definition": {"name": "X", "definition": "x", "description": "", "inputs": ["oops"]}},
+    {"type": "function", "definition": {"name": "X", "definition": "x", "description": "",
+                                        "inputs": [{"input_type": "Text", "default_value": 1, "options": ""}]}},
+    {"type": "function", "definition": {"name": "X", "definition": "x", "description": "",
+                                        "inputs": [{"input_type": "Text", "default_value": ""}]}},
+    ["not", "a", "record"],
+])
+def test_malformed_records_raise_value_error(tmp_path, record):
+    bundle = str(tmp_path / "broken.stacks.gz")
+    writeBundle(bundle, [{"type": "stack", "name": "Fine", "actions": []}, record])
+    with pytest.raises(ValueError):
+        readBundle(bundle)
+
+
+@pytest.mark.parametrize("version", ["2", 1.0, True, None])
+def test_malformed_header_version_raises_value_error(tmp_path, version):
+    bundle = str(tmp_path / "broken.stacks.gz")
+    with gzip.open(bundle, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "bundle", "format": BUNDLE_FORMAT, "version": version}) + "\n")
+    with pytest.raises(ValueError, match="malformed header"):
+        readBundle(bundle)
+
+
+def test_embedded_function_definitions_can_be_appended(tmp_path):
+    definition = {"name": "X", "definition": "x", "description": "Does x",
+                  "inputs": [{"input_type": "Dropdown", "default_value": "A", "options": "A,B"}]}
+    bundle = str(tmp_path / "functions.stacks.gz")
+    writeBundle(bundle, [{"type": "function", "definition": definition}])
+    functions, _ = readBundle(bundle)
+    config = str(tmp_path / "functions_config.xml")
+    appendFunctionDefinitions(config, functions)
+    assert FunctionRegistry.fromXML(config, use_cache=False).byName("X") == definition
+
+
+def test_content_already_in_library_is_not_imported_again(tmp_path, actions, plain):
+    store = openStackStore(str(tmp_path / "saved_stacks.db"))
+    store.upsertStack("Original", actions("a"))
+    bundle = str(tmp_path / "shared.stacks.gz")
+    writeBundle(bundle, [
+        {"type": "stack", "name": "Copy under a new name", "actions": [["Plot", "0", "a"]]},
+        {"type": "stack", "name": "New", "actions": [["Plot", "0", "n"]]},
+        {"type": "stack", "name": "New again", "actions": [["Plot", "0", "n"]]},
+        {"type": "stack", "name": "Original", "actions": [["Plot", "0", "changed"]]},
+    ])
+
+    report = importBundle(store, bundle)
+    assert report["duplicates"] == [("Copy under a new name", "Original"), ("New again", "New")]
+    assert "Not created 'Copy under a new name'" in formatImportReport(report)
+    assert report["renamed"] == [("Original", "Original (imported)")]
+    assert sorted(store.listNames()) == ["New", "Original", "Original (imported)"]
+
+    report = importBundle(store, bundle, on_conflict="replace")
+    assert plain(store.getStack("Original")) == actions("changed")
+
+
+@pytest.mark.parametrize("library", ["saved_stacks.xml", "saved_stacks.journal", "saved_stacks.db"])
+def test_stack_created_by_another_session_during_import_is_not_overwritten(tmp_path, monkeypatch, library, actions,
+                                                                           plain):
+    path = str(tmp_path / library)
+    store = openStackStore(path)
+    bundle = str(tmp_path / "shared.stacks.gz")
+    writeBundle(bundle, [{"type": "stack", "name": "Shot", "actions": [["Plot", "0", "bundle"]]}])
+
+    # Another session saves "Shot" after the import has read the library but before it writes.
+    upsertStacks = store.upsertStacks
+
+    def racingUpsertStacks(stacks, expected_versions=None):
+        openStackStore(path).upsertStack("Shot", actions("other session"))
+        return upsertStacks(stacks, expected_versions)
+
+    monkeypatch.setattr(store, "upsertStacks", racingUpsertStacks)
+    with pytest.raises(StackConflictError):
+        importBundle(store, bundle)
+    assert plain(openStackStore(path).getStack("Shot")) == actions("other session")
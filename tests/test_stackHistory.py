@@ -0,0 +1,22 @@
+import sqlite3
+
+import pytest
+
+from stackHistory import StackHistory
+from stackStore import stackVersion
+
+
+def test_rolled_back_save_leaves_no_stale_action_ids(tmp_path, actions):
+    history = StackHistory(str(tmp_path / "stacks.history"))
+    shot = actions("Hips")
+    history.connection.execute("CREATE TRIGGER fail BEFORE INSERT ON revisions BEGIN SELECT RAISE(ABORT, 'full'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        history.record([("Shot", shot)])
+    assert history.stats()["actions"] == 0
+
+    history.connection.execute("DROP TRIGGER fail")
+    # A different first action takes the id the rolled-back one had.
+    history.record([("Other", actions("Spine"))])
+    assert history.record([("Shot", shot)]) == ["Shot"]
+    assert history.getRevision(stackVersion(shot)) == shot
+    history.close()
@@ -0,0 +1,53 @@
+from functionRegistry import FunctionRegistry, appendFunctionDefinitions
+from stackEngine import StackEngine
+from stackPlan import compileStack
+from stackStore import openStackStore
+from stackValidation import validateStack
+
+
+DEFINITIONS = [
+    {"name": "Select Effector", "definition": "select_effector", "inputs": []},
+    {"name": "Rename Take", "definition": "rename_take", "inputs": [
+        {"input_type": "Text", "default_value": "_OLD", "options": ""},
+        {"input_type": "Dropdown", "default_value": "B", "options": "A,B"},
+    ]},
+]
+
+
+def actionFunctions(calls):
+    def select_effector():
+        calls.append(("select_effector",))
+
+    def rename_take(suffix, mode):
+        calls.append(("rename_take", suffix, mode))
+
+    return {"select_effector": select_effector, "rename_take": rename_take}
+
+
+def test_gui_rows_and_saved_values_get_the_same_arguments():
+    registry = FunctionRegistry(DEFINITIONS)
+    functions = actionFunctions([])
+    # What GUI.collectRowActions reads from the rows, and what saveStack writes for them.
+    rows = [{"name": "Select Effector", "args": [""]}, {"name": "Rename Take", "args": ["", "A"]}]
+    saved = [{"name": "Select Effector", "value": ""}, {"name": "Rename Take", "value": ";A"}]
+
+    from_rows = compileStack(rows, registry, functions)
+    from_saved = compileStack(saved, registry, functions)
+    assert [step.args for step in from_rows.steps] == [step.args for step in from_saved.steps]
+    assert [step.args for step in from_rows.steps] == [(), ("_OLD", "A")]
+    assert validateStack(rows, registry, functions) == validateStack(saved, registry, functions) == []
+
+
+def test_engine_runs_a_function_without_inputs(tmp_path):
+    config = str(tmp_path / "functions_config.xml")
+    appendFunctionDefinitions(config, DEFINITIONS)
+    stacks = str(tmp_path / "saved_stacks.xml")
+    openStackStore(stacks).upsertStack("Stack", [
+        {"name": "Select Effector", "index": "0", "value": ""},
+        {"name": "Rename Take", "index": "1", "value": "_NEW"},
+    ])
+
+    calls = []
+    result = StackEngine(config, stacks, actionFunctions(calls)).runStack("Stack")
+    assert result["success"], result["error"]
+    assert calls == [("select_effector",), ("rename_take", "_NEW", "B")]
@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+from stackLock import stressStackStore
+from stackStore import (JournalStackStore, NEW_STACK, StackConflictError, openStackStore, readStacksXML,
+                        stackVersion)
+
+
+BACKENDS = ("saved_stacks.xml", "saved_stacks.journal", "saved_stacks.db")
+
+
+@pytest.fixture(params=BACKENDS)
+def library(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+def test_upsert_get_and_list(library, actions, plain):
+    store = openStackStore(library)
+    store.upsertStack("A", actions("a"))
+    store.upsertStack("B", actions("b1", "b2"))
+    store.upsertStack("A", actions("a2"))
+
+    reopened = openStackStore(library)
+    assert sorted(reopened.listNames()) == ["A", "B"]  # Order after a replace differs per backend
+    assert plain(reopened.getStack("A")) == actions("a2")
+    assert plain(reopened.getStack("B")) == actions("b1", "b2")
+    assert reopened.getStack("missing") is None
+    assert reopened.getStackVersion("B") == stackVersion(actions("b1", "b2"))
+
+
+def test_delete_rename_and_duplicate(library, actions, plain):
+    store = openStackStore(library)
+    store.upsertStack("A", actions("a"))
+    store.upsertStack("B", actions("b"))
+
+    assert store.duplicateStack("A", "A copy")
+    assert not store.duplicateStack("A", "B")  # Name taken
+    assert not store.duplicateStack("missing", "C")
+    assert store.renameStack("A copy", "C")
+    assert not store.renameStack("C", "B")
+    assert not store.renameStack("missing", "D")
+    assert store.deleteStack("A")
+    assert not store.deleteStack("A")
+
+    reopened = openStackStore(library)
+    assert sorted(reopened.listNames()) == ["B", "C"]
+    assert plain(reopened.getStack("C")) == actions("a")
+
+
+def test_version_conflicts(library, actions, plain):
+    store = openStackStore(library)
+    store.upsertStack("A", actions("a"))
+    version = store.getStackVersion("A")
+
+    other_session = openStackStore(library)
+    other_session.upsertStack("A", actions("changed"))
+
+    with pytest.raises(StackConflictError):
+        store.upsertStack("A", actions("mine"), version)
+    with pytest.raises(StackConflictError):
+        store.deleteStack("A", version)
+    with pytest.raises(StackConflictError):
+        store.upsertStack("A", actions("new"), NEW_STACK)
+    assert plain(store.getStack("A")) == actions("changed")
+
+    store.upsertStack("A", actions("mine"), stackVersion(actions("changed")))
+    store.upsertStack("B", actions("b"), NEW_STACK)
+    assert plain(openStackStore(library).getStack("A")) == actions("mine")
+
+
+def test_upsert_stacks_skips_unchanged(library, actions):
+    store = openStackStore(library)
+    store.upsertStack("A", actions("a"))
+    assert store.upsertStacks([("A", actions("a")), ("B", actions("b"))]) == ["B"]
+    assert sorted(openStackStore(library).listNames()) == ["A", "B"]
+
+
+def test_export_and_import_xml(library, tmp_path, actions, plain):
+    store = openStackStore(library)
+    store.upsertStack("A", actions("a", "b"))
+    exported = str(tmp_path / "exported.xml")
+    store.exportXML(exported)
+    assert [(name, stack) for name, stack in readStacksXML(exported)] == [("A", actions("a", "b"))]
+
+    other = openStackStore(str(tmp_path / "other.db"))
+    assert other.importXML(exported) == 1
+    assert plain(other.getStack("A")) == actions("a", "b")
+
+
+def test_journal_drops_torn_last_record(tmp_path, actions, plain):
+    path = str(tmp_path / "saved_stacks.journal")
+    store = JournalStackStore(path)
+    store.upsertStack("A", actions("a"))
+    store.upsertStack("B", actions("b"))
+    with open(path, "ab") as f:
+        f.write(b'{"op":"replace","name":"A","actions":[{"na')  # Crash mid-append
+
+    reopened = JournalStackStore(path)
+    assert plain(reopened.getStack("A")) == actions("a")
+    reopened.upsertStack("C", actions("c"))  # Truncates the torn record before appending
+
+    again = JournalStackStore(path)
+    assert again.listNames() == ["A", "B", "C"]
+    with open(path, "rb") as f:
+        assert all(line.endswith(b"\n") for line in f)
+
+
+def test_journal_compaction(tmp_path, actions, plain):
+    path = str(tmp_path / "saved_stacks.journal")
+    store = JournalStackStore(path, compact_min=10 ** 6)  # Only compact when asked
+    for i in range(100):
+        store.upsertStack(f"S{i % 5}", actions(str(i)))
+    store.deleteStack("S4")
+    store.renameStack("S3", "Renamed")
+    other_session = JournalStackStore(path)
+
+    store.compact()
+    with open(path, "rb") as f:
+        assert len(f.readlines()) == 1 + 4  # Header plus one add per live stack
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".compact")]
+
+    other_session.upsertStack("S0", actions("after compaction"))  # Picks up the new journal
+    reopened = JournalStackStore(path)
+    assert reopened.listNames() == ["S1", "S2", "Renamed", "S0"]
+    assert plain(reopened.getStack("S0")) == actions("after compaction")
+    assert plain(reopened.getStack("Renamed")) == actions("98")
+
+
+def test_journal_background_compaction(tmp_path, actions, plain):
+    path = str(tmp_path / "saved_stacks.journal")
+    store = JournalStackStore(path, compact_min=20)
+    for i in range(200):
+        store.upsertStack(f"S{i % 3}", actions(str(i)))
+        if i % 50 == 0:
+            store.compact()  # Alongside the background compactions
+    if store._compactor is not None:
+        store._compactor.join()
+
+    reopened = JournalStackStore(path)
+    assert [plain(reopened.getStack(f"S{k}")) for k in range(3)] == [actions("198"), actions("199"), actions("197")]
+    assert reopened._records < 200
+
+
+def test_multi_process_stress(library):
+    assert stressStackStore(library, processes=3, rounds=15)
@@ -9,6 +9,7 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Func
 sys.path.append(parent_dir)
 
 from actionsList import ACTION_FUNCTIONS
+from functionRegistry import loadFunctionConfig
 FUNCTION_DEFS = list(ACTION_FUNCTIONS.keys())
 
 INPUT_TYPE_OPTIONS = ["None", "Bool", "String", "Integer", "EffectorSelection Object Type", "Dropdown"]
@@ -100,22 +101,20 @@ class XMLCreatorDialog(QtWidgets.QDialog):
         if not os.path.exists(CONFIG_FILE):
             return
         try:
-            tree = ET.parse(CONFIG_FILE)
-            root = tree.getroot()
-            for function_elem in root.findall("Function"):
-                fn_name = function_elem.get("name", "")
-                definition = function_elem.findtext("Definition", "")
-                desc = function_elem.findtext("Description", "")
-                input_elem = function_elem.find("./Inputs/Input")
-                if input_elem is not None:
-                    input_type = input_elem.get("type", "None")
-                    default_value = input_elem.get("default", "")
-                    options = input_elem.get("options", "")
+            # Same compiled cache GUIGUI starts from, so a large config is parsed once.
+            definitions, _ = loadFunctionConfig(CONFIG_FILE)
+            for func_def in definitions:
+                inputs = func_def["inputs"]
+                if inputs:
+                    input_type = inputs[0]["input_type"]
+                    default_value = inputs[0]["default_value"]
+                    options = inputs[0]["options"]
                 else:
                     input_type = "None"
                     default_value = ""
                     options = ""
-                self.addFunctionRow(fn_name, definition, input_type, default_value, options, desc)
+                self.addFunctionRow(func_def["name"], func_def["definition"], input_type, default_value, options,
+                                    func_def["description"])
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, "Error", f"Failed to load existing XML:\n{str(e)}")
 